@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def normalize_question(question: str) -> str:
+    """공백·대소문자 차이만 있는 질문은 같은 키로 취급"""
+    return " ".join(question.split()).lower()
+
+
+class AnswerCache:
+    """
+    질문별 생성 답변을 보관하는 메모리 LRU 캐시
+
+    마감 시간을 넘겨 요약 답변을 돌려준 질문도 백그라운드에서 끝난 생성 결과가
+    여기에 저장되므로, 같은 질문을 다시 하면 바로 전체 답변을 받을 수 있습니다.
+    교재 리비전이 활성화되면 clear()로 비우고, ttl은 그 밖의 경우를 위한 만료 시간입니다.
+    업로드 작업 완료 콜백(별도 스레드)에서도 호출되므로 잠금으로 보호합니다.
+
+    Args:
+        max_size: 보관할 최대 질문 수 (0이면 캐시 비활성화)
+        ttl: 답변 유효 시간 (초)
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # clear()마다 증가. 비우기 전에 시작된 생성 결과가 나중에 저장되는 것을 막는 데 사용
+        self.version = 0
+
+    def get(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            answer, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return answer
+
+    def put(self, question: str, answer: str, version: Optional[int] = None):
+        """
+        답변 저장
+
+        Args:
+            version: 답변 생성을 시작할 때의 self.version (그 뒤에 캐시가 비워졌다면 저장하지 않음)
+        """
+        if self.max_size <= 0:
+            return
+        key = normalize_question(question)
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (answer, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
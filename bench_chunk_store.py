@@ -0,0 +1,80 @@
+import argparse
+import json
+import random
+import time
+
+from chunk_store import ChunkStore
+from rag_system import RAGSystem
+
+WORDS = (
+    "검색광고 파워링크 품질지수 클릭률 노출수 입찰가 키워드 캠페인 광고그룹 예산 전환율 "
+    "타겟팅 네이버 구글애즈 메타 인스타그램 도달 빈도 CPC CPM ROAS 랜딩페이지 확장소재"
+).split()
+
+
+def make_chunk(rng: random.Random, size: int = 1000) -> str:
+    """업로드 청크와 비슷한 길이(약 1000자)의 교재 문장"""
+    words = []
+    while sum(len(word) + 1 for word in words) < size:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)
+
+
+def payload_size(matches) -> int:
+    """Pinecone 조회 응답(JSON) 바이트 수"""
+    response = {"matches": matches, "namespace": "", "usage": {"read_units": 6}}
+    return len(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="메타데이터 원문 조회 vs id/점수 조회 + 로컬 복원 비교")
+    parser.add_argument("--chunks", type=int, default=2000, help="저장소 청크 수")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    store = ChunkStore(":memory:")
+    metadatas = {}
+    items = []
+    for i in range(args.chunks):
+        metadata = {
+            'source': rng.choice(["검색광고마케터1급", "SNS광고마케터1급"]),
+            'chunk_id': i,
+            'chapter': f"Chapter {rng.randint(1, 12)}",
+            'total_chunks': args.chunks,
+            'revision': 1700000000,
+        }
+        doc_id = RAGSystem.make_doc_id(metadata)
+        text = make_chunk(rng)
+        metadatas[doc_id] = {**metadata, 'text': text}
+        items.append((doc_id, text, metadata))
+    store.put_many(items)
+    doc_ids = list(metadatas)
+
+    overfetch = args.top_k * RAGSystem.QUERY_OVERFETCH
+    before_bytes, after_bytes, hydrate_ms = [], [], []
+    for _ in range(args.queries):
+        hits = rng.sample(doc_ids, overfetch)
+        scores = sorted((rng.random() for _ in hits), reverse=True)
+
+        # 이전: top_k개를 메타데이터(원문 포함)와 함께 받아옴
+        before_bytes.append(payload_size([
+            {'id': doc_id, 'score': score, 'values': [], 'metadata': metadatas[doc_id]}
+            for doc_id, score in list(zip(hits, scores))[:args.top_k]
+        ]))
+
+        # 현재: id/점수만 top_k * QUERY_OVERFETCH개 받아온 뒤 로컬 저장소에서 복원
+        matches = [{'id': doc_id, 'score': score, 'values': []} for doc_id, score in zip(hits, scores)]
+        after_bytes.append(payload_size(matches))
+        start = time.perf_counter()
+        chunks = store.get_many(doc_id for doc_id in hits)
+        docs = [chunk for chunk in chunks.values() if store.is_active(chunk)][:args.top_k]
+        hydrate_ms.append((time.perf_counter() - start) * 1000)
+
+    hydrate_ms.sort()
+    print(f"📊 Pinecone 조회 응답 크기 (청크 {args.chunks}개, top_k={args.top_k}, 질문 {args.queries}개)")
+    print(f"   이전: 메타데이터 포함 top_k={args.top_k}     평균 {sum(before_bytes) / len(before_bytes):>8,.0f} bytes")
+    print(f"   현재: id/점수만 top_k={overfetch}          평균 {sum(after_bytes) / len(after_bytes):>8,.0f} bytes")
+    print(f"   로컬 복원 (hydrate)             p50 {hydrate_ms[len(hydrate_ms) // 2] * 1000:.1f}µs / "
+          f"p95 {hydrate_ms[int(len(hydrate_ms) * 0.95)] * 1000:.1f}µs")
@@ -0,0 +1,94 @@
+import argparse
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
+from fastapi.testclient import TestClient
+
+import build_static
+from static_assets import StaticAssets
+
+
+def legacy_html() -> str:
+    """이전 방식처럼 CSS/JS를 HTML 안에 인라인으로 넣은 페이지"""
+    with open(os.path.join(build_static.SRC_DIR, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+    for name, tag in (("app.css", "style"), ("app.js", "script")):
+        with open(os.path.join(build_static.SRC_DIR, name), encoding="utf-8") as f:
+            inline = f"<{tag}>\n{f.read()}</{tag}>"
+        html = html.replace(f'<link rel="stylesheet" href="{name}">', inline)
+        html = html.replace(f'<script src="{name}"></script>', inline)
+    return html
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    assets = StaticAssets()
+    html = legacy_html()
+
+    @app.get("/legacy")
+    async def legacy():
+        return HTMLResponse(content=html)
+
+    @app.get("/")
+    async def home(request: Request):
+        return assets.response(request, "index.html")
+
+    @app.get("/static/{filename}")
+    async def static_file(request: Request, filename: str):
+        return assets.response(request, filename)
+
+    return app, assets
+
+
+def wire_bytes(response) -> int:
+    """상태줄 + 헤더 + 본문(전송된 압축 상태 그대로) 바이트 수"""
+    head = len(f"HTTP/1.1 {response.status_code}\r\n")
+    head += sum(len(k) + len(v) + 4 for k, v in response.headers.items()) + 2
+    return head + int(response.headers.get("content-length", 0))
+
+
+def visit(client, paths, headers) -> tuple:
+    """페이지 방문 한 번에 필요한 요청을 보내고 (요청 수, 전송 바이트, 소요 ms) 반환"""
+    total = 0
+    start = time.perf_counter()
+    for path in paths:
+        response = client.get(path, headers=headers.get(path, {}))
+        total += wire_bytes(response)
+    return len(paths), total, (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="채팅 UI 전송량/재방문 비용 비교")
+    parser.add_argument("--rtt-ms", type=float, default=150, help="모바일 네트워크 왕복 지연 가정")
+    parser.add_argument("--bandwidth-kbps", type=float, default=1600, help="모바일 대역폭 가정")
+    parser.add_argument("--encoding", default="br, gzip", help="Accept-Encoding 헤더 값")
+    args = parser.parse_args()
+
+    build_static.build()
+    app, assets = create_app()
+    client = TestClient(app)
+    accept = {"Accept-Encoding": args.encoding}
+
+    asset_paths = [f"/static/{name}" for name, entry in assets.files.items() if entry["immutable"]]
+    index_etag = client.get("/", headers=accept).headers["etag"]
+
+    scenarios = [
+        ("이전: 인라인 HTML (매 방문)", ["/legacy"], {"/legacy": {"Accept-Encoding": "identity"}}),
+        ("신규: 첫 방문", ["/"] + asset_paths, {path: accept for path in ["/"] + asset_paths}),
+        # 재방문: 해시 파일명 에셋은 immutable 캐시에서 바로 쓰고 index.html만 재검증
+        ("신규: 재방문 (304)", ["/"], {"/": {**accept, "If-None-Match": index_etag}}),
+    ]
+
+    print(f"📊 채팅 UI 전송 비교 (Accept-Encoding: {args.encoding}, "
+          f"RTT {args.rtt_ms:.0f}ms, {args.bandwidth_kbps:.0f}kbps 가정)")
+    print(f"   {'시나리오':<28}{'요청':>6}{'전송 바이트':>14}{'서버 처리 ms':>14}{'예상 전송 ms':>14}")
+    for label, paths, headers in scenarios:
+        runs = [visit(client, paths, headers) for _ in range(20)]
+        requests_count, total_bytes, _ = runs[0]
+        elapsed = sorted(run[2] for run in runs)[len(runs) // 2]
+        # 에셋 요청은 병렬로 가정하여 왕복은 (HTML 1회 + 에셋 1회)만 계산
+        round_trips = 1 if len(paths) == 1 else 2
+        estimated = round_trips * args.rtt_ms + total_bytes * 8 / args.bandwidth_kbps
+        print(f"   {label:<28}{requests_count:>6}{total_bytes:>14,}{elapsed:>14.2f}{estimated:>14.0f}")
@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "src")
+DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "dist")
+
+# 내용 해시를 파일명에 붙여 장기 캐시하는 에셋 (index.html은 이름 고정)
+HASHED_ASSETS = ["app.css", "app.js"]
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+}
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _write_variants(filename: str, data: bytes) -> dict:
+    """원본과 gzip/brotli 압축본을 기록하고 manifest 항목을 반환"""
+    with open(os.path.join(DIST_DIR, filename), "wb") as f:
+        f.write(data)
+
+    encodings = {}
+    # mtime=0으로 고정하여 같은 입력이면 항상 같은 압축 결과가 나오도록 함
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        with open(os.path.join(DIST_DIR, filename + ".gz"), "wb") as f:
+            f.write(gz)
+        encodings["gzip"] = filename + ".gz"
+
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            with open(os.path.join(DIST_DIR, filename + ".br"), "wb") as f:
+                f.write(br)
+            encodings["br"] = filename + ".br"
+
+    return {
+        "file": filename,
+        "etag": _content_hash(data),
+        "content_type": CONTENT_TYPES[os.path.splitext(filename)[1]],
+        "encodings": encodings,
+    }
+
+
+def build() -> dict:
+    """
+    static/src의 채팅 UI를 static/dist로 빌드
+
+    CSS/JS는 내용 해시가 붙은 파일명으로 복사하고 index.html의 참조를 바꾼 뒤,
+    모든 파일에 대해 gzip(및 brotli 설치 시 br) 압축본을 미리 만들어 둡니다.
+    서버는 manifest.json만 읽어 요청마다 압축하지 않고 바로 전송합니다.
+    """
+    if os.path.exists(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    with open(os.path.join(SRC_DIR, "index.html"), encoding="utf-8") as f:
+        index_html = f.read()
+
+    manifest = {}
+    for name in HASHED_ASSETS:
+        with open(os.path.join(SRC_DIR, name), "rb") as f:
+            data = f.read()
+        base, ext = os.path.splitext(name)
+        hashed_name = f"{base}.{_content_hash(data)}{ext}"
+        manifest[hashed_name] = _write_variants(hashed_name, data)
+        manifest[hashed_name]["immutable"] = True
+        index_html = index_html.replace(f'"{name}"', f'"/static/{hashed_name}"')
+
+    manifest["index.html"] = _write_variants("index.html", index_html.encode("utf-8"))
+    manifest["index.html"]["immutable"] = False
+
+    with open(os.path.join(DIST_DIR, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    return manifest
+
+
+if __name__ == "__main__":
+    if brotli is None:
+        print("⚠️  brotli 패키지가 없어 gzip 압축본만 생성합니다")
+    manifest = build()
+    for name, entry in manifest.items():
+        sizes = [f"원본 {os.path.getsize(os.path.join(DIST_DIR, entry['file'])):,}B"]
+        for encoding, variant in entry["encodings"].items():
+            sizes.append(f"{encoding} {os.path.getsize(os.path.join(DIST_DIR, variant)):,}B")
+        print(f"📦 {name}: {', '.join(sizes)}")
+    print(f"✅ 정적 파일 빌드 완료: {DIST_DIR}")
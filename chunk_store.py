@@ -0,0 +1,246 @@
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 여러 교재에 똑같이 나오는 청크(중복 제거 후 대표 청크)의 소유 교재
+# 한 교재의 리비전에 속하지 않고, refs에 적힌 교재 리비전 중 하나라도 활성이면 사용됨
+SHARED_SOURCE = "__shared__"
+
+
+def revision_refs(chunk: Dict) -> List[Tuple[str, int]]:
+    """
+    청크를 사용하는 (교재, 리비전) 목록
+
+    공유 청크는 metadata['refs']의 "교재@리비전" 문자열, 일반 청크는 자기 교재와 리비전
+    (Pinecone 메타데이터에는 중첩 객체를 넣을 수 없어 문자열 리스트로 저장)
+    """
+    refs = chunk.get('refs')
+    if not refs:
+        return [(chunk.get('source', ''), chunk.get('revision', 0))]
+    pairs = []
+    for ref in refs:
+        source, _, revision = ref.rpartition('@')
+        pairs.append((source, int(revision)))
+    return pairs
+
+
+def make_ref(source: str, revision: int) -> str:
+    return f"{source}@{revision}"
+
+
+class ChunkStore:
+    """
+    교재 청크 원문을 로컬에 보관하는 문서 저장소
+
+    검색은 Pinecone에서 id와 점수만 받아오고, 원문 텍스트는 doc_id를 키로
+    SQLite 파일에서 찾습니다. 시작 시 전체 내용을 메모리에 올려두므로
+    검색 결과 복원(hydrate)은 네트워크 없이 dict 조회로 끝납니다.
+    원본은 Pinecone 메타데이터에도 남아 있으므로, 저장소가 비어 있는 서버
+    (Railway 재배포 등)는 처음 검색된 청크를 Pinecone에서 가져와 채웁니다.
+    (교재별 활성 리비전도 Pinecone에 표식으로 남겨 빈 저장소에서 복원합니다)
+
+    교재를 다시 업로드하면 새 리비전으로 청크를 저장해두었다가, 업로드가 끝난 뒤
+    activate_revision으로 교재별 활성 리비전을 한 번에 바꿉니다.
+    """
+
+    def __init__(self, db_path: str = "chunk_store.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # 업로드 작업 프로세스가 같은 파일에 쓰는 동안에도 읽을 수 있도록 WAL 모드 사용
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                doc_id   TEXT PRIMARY KEY,
+                text     TEXT NOT NULL,
+                source   TEXT,
+                chapter  TEXT,
+                metadata TEXT
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                source   TEXT PRIMARY KEY,
+                revision INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._chunks: Dict[str, Dict] = {}
+        self._active: Dict[str, int] = {}
+        self.reload()
+
+    def reload(self):
+        """SQLite 파일 내용을 메모리로 다시 읽어옴"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, text, source, chapter, metadata FROM chunks"
+            ).fetchall()
+            active = dict(self._conn.execute("SELECT source, revision FROM sources").fetchall())
+        chunks = {}
+        for doc_id, text, source, chapter, metadata in rows:
+            chunks[doc_id] = self._row_to_chunk(text, source, chapter, metadata)
+        # 참조 교체만으로 반영되도록 새 dict를 만든 뒤 한 번에 바꿔 끼움
+        self._chunks, self._active = chunks, active
+
+    @staticmethod
+    def _row_to_chunk(text: str, source: str, chapter: str, metadata: Optional[str]) -> Dict:
+        chunk = json.loads(metadata) if metadata else {}
+        chunk.update({'text': text, 'source': source or '', 'chapter': chapter or ''})
+        return chunk
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._chunks
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        """doc_id에 해당하는 청크 (없으면 None)"""
+        return self._chunks.get(doc_id)
+
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        여러 doc_id를 한 번에 조회
+
+        Returns:
+            {doc_id: 청크} 딕셔너리 (저장소에 없는 id는 제외)
+        """
+        chunks = self._chunks
+        return {doc_id: chunks[doc_id] for doc_id in doc_ids if doc_id in chunks}
+
+    def is_active(self, chunk: Dict) -> bool:
+        """
+        청크가 해당 교재의 활성 리비전에 속하는지
+        (공유 청크는 참조하는 교재 리비전 중 하나라도 활성이면 사용)
+
+        리비전을 활성화한 적이 없는 교재는 리비전 0(리비전 없는 기존 청크)만 활성입니다.
+        업로드 중인 새 리비전 청크가 Pinecone에서 먼저 검색되더라도 섞이지 않도록,
+        저장소가 비어 있는 서버는 RAGSystem이 Pinecone의 리비전 표식으로 활성 리비전을 채웁니다.
+        """
+        active = self._active
+        return any(revision == active.get(source, 0) for source, revision in revision_refs(chunk))
+
+    def active_revision(self, source: str) -> Optional[int]:
+        """교재의 활성 리비전 (이 저장소에 기록된 적이 없으면 None)"""
+        return self._active.get(source)
+
+    def revision_counts(self, source: str) -> Dict[int, int]:
+        """저장소에 있는 교재 청크의 리비전별 개수"""
+        counts: Dict[int, int] = {}
+        for chunk in list(self._chunks.values()):
+            if chunk.get('source', '') == source:
+                revision = int(chunk.get('revision', 0))
+                counts[revision] = counts.get(revision, 0) + 1
+        return counts
+
+    def set_active(self, source: str, revision: int):
+        """청크를 삭제하지 않고 활성 리비전만 기록 (현재 서비스 중인 리비전 고정용)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (source, revision) VALUES (?, ?)", (source, revision)
+            )
+            self._conn.commit()
+        self._active = {**self._active, source: revision}
+
+    def activate_revision(self, source: str, revision: int) -> List[str]:
+        """
+        교재의 활성 리비전을 교체하고 이전 리비전 청크를 삭제
+
+        이 교재의 이전 리비전을 참조하던 공유 청크는 다른 교재의 활성 리비전도
+        참조하지 않을 때만 삭제합니다.
+        전환과 삭제는 하나의 트랜잭션으로 처리되며, 메모리 내용도 한 번에 교체됩니다.
+
+        Returns:
+            삭제된 이전 리비전 청크의 doc_id 리스트 (벡터 DB에서도 지워야 함)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, metadata FROM chunks WHERE source = ?", (source,)
+            ).fetchall()
+            stale = [
+                doc_id for doc_id, metadata in rows
+                if json.loads(metadata or '{}').get('revision', 0) != revision
+            ]
+            active = dict(self._conn.execute("SELECT source, revision FROM sources").fetchall())
+            active[source] = revision
+            for doc_id, metadata in self._conn.execute(
+                "SELECT doc_id, metadata FROM chunks WHERE source = ?", (SHARED_SOURCE,)
+            ).fetchall():
+                refs = revision_refs(json.loads(metadata or '{}'))
+                if (any(ref_source == source for ref_source, _ in refs)
+                        and not any(active.get(ref_source, 0) == ref_revision for ref_source, ref_revision in refs)):
+                    stale.append(doc_id)
+            self._conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(doc_id,) for doc_id in stale])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (source, revision) VALUES (?, ?)", (source, revision)
+            )
+            self._conn.commit()
+
+        self.reload()
+        return stale
+
+    def discard_revision(self, source: str, revision: int) -> List[str]:
+        """
+        활성화되지 않은 리비전의 청크를 삭제 (실패한 업로드 정리용)
+
+        Returns:
+            삭제된 청크의 doc_id 리스트 (벡터 DB에서도 지워야 함)
+        """
+        if self._active.get(source) == revision:
+            return []
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, metadata FROM chunks WHERE source = ?", (source,)
+            ).fetchall()
+            discarded = [
+                doc_id for doc_id, metadata in rows
+                if json.loads(metadata or '{}').get('revision', 0) == revision
+            ]
+            self._conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(doc_id,) for doc_id in discarded])
+            self._conn.commit()
+
+        self.reload()
+        return discarded
+
+    def put(self, doc_id: str, text: str, metadata: Dict):
+        """청크 하나를 저장"""
+        self.put_many([(doc_id, text, metadata)])
+
+    def put_many(self, items: List[Tuple[str, str, Dict]]):
+        """
+        여러 청크를 하나의 트랜잭션으로 저장
+
+        Args:
+            items: (doc_id, text, metadata) 튜플 리스트
+        """
+        rows = []
+        for doc_id, text, metadata in items:
+            extra = {k: v for k, v in metadata.items() if k not in ('text', 'source', 'chapter')}
+            rows.append((
+                doc_id,
+                text,
+                metadata.get('source', ''),
+                metadata.get('chapter', ''),
+                json.dumps(extra, ensure_ascii=False),
+            ))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (doc_id, text, source, chapter, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+        for doc_id, text, source, chapter, metadata in rows:
+            self._chunks[doc_id] = self._row_to_chunk(text, source, chapter, metadata)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
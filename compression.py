@@ -0,0 +1,55 @@
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+
+
+class JSONGZipMiddleware:
+    """
+    JSON 응답만 gzip으로 압축하는 ASGI 미들웨어
+
+    Starlette의 GZipMiddleware는 스트리밍 응답까지 버퍼링해 압축하므로
+    /chat/batch의 NDJSON 스트림이 질문별로 바로 전달되지 않습니다.
+    여기서는 한 번에 전송되는 application/json 응답만 압축하고,
+    스트리밍 응답이나 이미 압축된 응답(정적 파일)은 그대로 통과시킵니다.
+    """
+
+    def __init__(self, app, minimum_size: int = 500, compresslevel: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # 본문 첫 조각을 보고 압축 여부를 정해야 하므로 헤더 전송을 보류
+                start_message = message
+                return
+
+            if message["type"] == "http.response.body" and start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start["headers"])
+                body = message.get("body", b"")
+
+                if (
+                    headers.get("content-type", "").startswith("application/json")
+                    and "content-encoding" not in headers
+                    and not message.get("more_body", False)
+                    and len(body) >= self.minimum_size
+                ):
+                    body = gzip.compress(body, compresslevel=self.compresslevel)
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                    message = {**message, "body": body}
+
+                await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import struct
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# 두 청크의 글자 5-gram 자카드 유사도가 이 값 이상이면 중복으로 보고 하나만 임베딩
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.8))
+
+SHINGLE_SIZE = 5
+# 시그니처 길이 (2의 거듭제곱)
+NUM_HASHES = 128
+# 16개 밴드 x 8행: 유사도 약 0.7 이상인 쌍이 높은 확률로 후보가 됨 (후보는 실제 자카드로 검증)
+NUM_BANDS = 16
+
+_BIN_BITS = NUM_HASHES.bit_length() - 1
+_EMPTY_BIN = 1 << 64
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """공백을 정리한 텍스트의 글자 n-gram 해시 집합"""
+    normalized = " ".join(text.lower().split())
+    if len(normalized) <= size:
+        grams = [normalized]
+    else:
+        grams = (normalized[i:i + size] for i in range(len(normalized) - size + 1))
+    return {
+        struct.unpack("<Q", hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest())[0]
+        for gram in grams
+    }
+
+
+def minhash(shingle_set: set) -> Tuple[int, ...]:
+    """
+    shingle 집합의 MinHash 시그니처 (one permutation hashing)
+
+    해시 함수를 NUM_HASHES번 적용하는 대신, 해시 값의 하위 비트로 구간을 나누고
+    구간마다 최솟값을 취합니다. 한 번의 순회로 끝나므로 순수 파이썬에서도
+    청크 하나에 1ms 미만으로 계산됩니다.
+    """
+    signature = [_EMPTY_BIN] * NUM_HASHES
+    mask = NUM_HASHES - 1
+    for x in shingle_set:
+        bin_index = x & mask
+        value = x >> _BIN_BITS
+        if value < signature[bin_index]:
+            signature[bin_index] = value
+    return tuple(signature)
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def find_duplicates(texts: List[str], threshold: float = DEDUP_THRESHOLD) -> List[List[int]]:
+    """
+    MinHash LSH로 거의 같은 텍스트끼리 묶음
+
+    같은 밴드 해시를 가진 쌍만 후보로 보고 실제 자카드 유사도로 확인한 뒤,
+    연결된 쌍을 union-find로 하나의 그룹으로 합칩니다.
+
+    Returns:
+        입력 순서 기준 인덱스 그룹 리스트 (각 그룹의 첫 인덱스가 대표, 중복이 없는 텍스트도 1개짜리 그룹)
+    """
+    shingle_sets = [shingles(text) for text in texts]
+    rows = NUM_HASHES // NUM_BANDS
+
+    buckets = defaultdict(list)
+    for i, shingle_set in enumerate(shingle_sets):
+        signature = minhash(shingle_set)
+        for band in range(NUM_BANDS):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(i)
+
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for members in buckets.values():
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if find(i) != find(j) and jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+                    # 먼저 나온 청크가 대표가 되도록 작은 인덱스를 루트로 둠
+                    root_i, root_j = find(i), find(j)
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def dedupe_chunks(items: List[Tuple[str, Dict]], threshold: float = DEDUP_THRESHOLD) -> Tuple[List[Tuple[str, Dict]], Dict]:
+    """
+    (텍스트, 메타데이터) 청크 목록에서 거의 같은 청크를 대표 청크 하나로 합침
+
+    대표 청크의 메타데이터에는 묶인 청크들의 교재 목록(sources)과, 출처를 잃지 않도록
+    묶인 청크 전체의 "교재#chunk_id"(merged_chunks)와 챕터(merged_chapters)를 기록합니다.
+
+    Returns:
+        (대표 청크 목록, 중복 제거 리포트)
+    """
+    groups = find_duplicates([text for text, _ in items], threshold)
+
+    kept = []
+    by_source = defaultdict(lambda: {'chunks': 0, 'dropped': 0})
+    examples = []
+    chars_saved = 0
+    for group in sorted(groups, key=lambda members: members[0]):
+        text, metadata = items[group[0]]
+        for index in group:
+            by_source[items[index][1].get('source', '')]['chunks'] += 1
+        if len(group) > 1:
+            members = [items[index][1] for index in group]
+            metadata = {
+                **metadata,
+                'sources': list(dict.fromkeys(member.get('source', '') for member in members)),
+                'merged_chunks': [f"{member.get('source', '')}#{member.get('chunk_id')}" for member in members],
+                'merged_chapters': [member.get('chapter', '') for member in members],
+            }
+            for index in group[1:]:
+                by_source[items[index][1].get('source', '')]['dropped'] += 1
+                chars_saved += len(items[index][0])
+            if len(examples) < 10:
+                examples.append({
+                    'canonical': f"{metadata.get('source', '')}#{metadata.get('chunk_id')}",
+                    'duplicates': [
+                        f"{items[index][1].get('source', '')}#{items[index][1].get('chunk_id')}"
+                        for index in group[1:]
+                    ],
+                    'preview': text[:80],
+                })
+        kept.append((text, metadata))
+
+    total = len(items)
+    report = {
+        'threshold': threshold,
+        'chunks': total,
+        'unique': len(kept),
+        'dropped': total - len(kept),
+        'dedup_ratio': round((total - len(kept)) / total, 4) if total else 0.0,
+        'duplicate_groups': sum(1 for group in groups if len(group) > 1),
+        'chars_saved': chars_saved,
+        'by_source': dict(by_source),
+        'examples': examples,
+    }
+    return kept, report
+
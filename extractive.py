@@ -0,0 +1,86 @@
+import re
+from typing import Dict, List
+
+# 문장 경계: 마침표/물음표/느낌표 뒤 공백, 또는 줄바꿈
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。])\s+|\n+")
+_NON_WORD = re.compile(r"[^\w]+")
+
+# 너무 짧은 조각(목차 번호, 머리글 등)과 너무 긴 문장은 답변 후보에서 제외
+MIN_SENTENCE_CHARS = 15
+MAX_SENTENCE_CHARS = 300
+
+# 문장 점수 = 질문과의 글자 bigram 겹침 + 청크 검색 점수(임베딩 유사도) 가중치
+CHUNK_SCORE_WEIGHT = 0.3
+
+FALLBACK_HEADER = "답변 생성이 지연되어 교재에서 찾은 관련 내용을 먼저 안내드립니다."
+
+
+def split_sentences(text: str) -> List[str]:
+    """청크 원문을 문장 단위로 분리"""
+    sentences = []
+    for part in _SENTENCE_BOUNDARY.split(text):
+        sentence = " ".join(part.split())
+        if MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS:
+            sentences.append(sentence)
+    return sentences
+
+
+def _bigrams(text: str) -> set:
+    # 한국어는 띄어쓰기·조사 변화가 많아 단어보다 글자 bigram 겹침이 안정적
+    compact = _NON_WORD.sub("", text.lower())
+    return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+
+def rank_sentences(question: str, docs: List[Dict]) -> List[Dict]:
+    """
+    검색된 청크의 문장들을 질문과의 관련도 순으로 정렬
+
+    Args:
+        question: 사용자 질문
+        docs: hydrate 결과 (text, source, chapter, score)
+
+    Returns:
+        [{"sentence", "source", "chapter", "score"}] (점수 내림차순)
+    """
+    question_grams = _bigrams(question)
+    if not question_grams:
+        return []
+
+    ranked = []
+    seen = set()
+    for doc in docs:
+        for sentence in split_sentences(doc.get('text', '')):
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+            overlap = len(question_grams & _bigrams(sentence)) / len(question_grams)
+            if overlap == 0:
+                continue
+            ranked.append({
+                'sentence': sentence,
+                'source': doc.get('source', ''),
+                'chapter': doc.get('chapter', ''),
+                'score': overlap + CHUNK_SCORE_WEIGHT * doc.get('score', 0.0),
+            })
+
+    ranked.sort(key=lambda item: item['score'], reverse=True)
+    return ranked
+
+
+def extractive_answer(question: str, docs: List[Dict], max_sentences: int = 3) -> str:
+    """
+    LLM 없이 검색된 청크에서 질문과 가장 관련 있는 문장을 골라 답변 구성
+
+    응답 생성이 마감 시간을 넘길 때 대신 돌려주는 답변으로, 문장마다 교재와 챕터를 표시합니다.
+    """
+    ranked = rank_sentences(question, docs)[:max_sentences]
+    if not ranked:
+        return "죄송합니다. 답변 생성이 지연되고 있습니다. 잠시 후 다시 질문해주세요."
+
+    lines = [FALLBACK_HEADER, ""]
+    for item in ranked:
+        # 챕터를 찾지 못한 청크("Unknown Chapter")는 교재 이름만 표시
+        chapter = item['chapter'] if item['chapter'] != "Unknown Chapter" else ""
+        attribution = " - ".join(part for part in (item['source'], chapter) if part)
+        lines.append(f"• {item['sentence']}" + (f" (출처: {attribution})" if attribution else ""))
+    return "\n".join(lines)
@@ -0,0 +1,257 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from tracing import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# 작업 프로세스에서 진행 상황을 서버로 보내는 큐 (프로세스 시작 시 전달됨)
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    """작업 프로세스 초기화: 진행 큐 연결 + 로그 설정 + 낮은 CPU 우선순위"""
+    global _progress_queue
+    _progress_queue = progress_queue
+    # spawn으로 시작된 프로세스는 서버의 로그 설정을 물려받지 않음
+    setup_logging()
+    if hasattr(os, "nice"):
+        # 추출/임베딩 작업이 같은 머신의 채팅 요청 처리보다 뒤로 밀리도록 함
+        os.nice(10)
+
+
+def _run_ingest_job(job_id: str, pdf_path: str, textbook_name: str, revision: int) -> Dict:
+    """작업 프로세스에서 실행되는 교재 업로드 (활성화는 서버 프로세스가 담당)"""
+    from upload_textbook import TextbookUploader
+
+    def progress(stage, done, total):
+        _progress_queue.put((job_id, stage, done, total))
+
+    uploader = TextbookUploader()
+    return uploader.upload_textbook(
+        pdf_path, textbook_name, revision=revision, activate=False, progress=progress
+    )
+
+
+class IngestJobManager:
+    """
+    교재 업로드 작업 큐
+
+    업로드된 PDF를 별도 작업 프로세스(한 번에 하나씩)에서 추출·임베딩하고,
+    진행 상황을 큐로 받아 작업 상태(단계, 완료 청크 수, 처리량, 예상 남은 시간)를 갱신합니다.
+    작업이 끝나면 서버 프로세스에서 새 리비전을 활성화하여 검색 데이터를 한 번에 교체합니다.
+
+    Args:
+        rag: 서버의 RAGSystem (리비전 활성화에 사용)
+        upload_dir: 업로드된 PDF를 임시로 저장할 디렉터리
+        on_activated: 새 리비전 활성화 직후 (교재 이름, 리비전)으로 호출 (답변 캐시 비우기 등)
+    """
+
+    def __init__(self, rag, upload_dir: str = "uploads",
+                 on_activated: Optional[Callable[[str, int], None]] = None):
+        self.rag = rag
+        self.upload_dir = upload_dir
+        self.on_activated = on_activated
+        os.makedirs(upload_dir, exist_ok=True)
+
+        self.jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+        # fork 시 서버의 스레드/클라이언트 상태가 복제되지 않도록 spawn 사용
+        self._context = multiprocessing.get_context("spawn")
+        self._progress_queue = self._context.Queue()
+        self._executor = self._new_executor()
+        threading.Thread(target=self._drain_progress, daemon=True).start()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._progress_queue,)
+        )
+
+    def _replace_executor(self, broken: ProcessPoolExecutor):
+        """
+        작업 프로세스가 비정상 종료(메모리 부족, PDF 파서 크래시 등)되어 망가진 풀을 새로 만듦
+
+        망가진 ProcessPoolExecutor는 이후 모든 submit에서 BrokenProcessPool을 던지므로
+        교체하지 않으면 서버를 재시작할 때까지 업로드가 불가능합니다.
+        """
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+        logger.warning("업로드 작업 프로세스 풀 재생성")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def upload_path(self, job_id: str) -> str:
+        return os.path.join(self.upload_dir, f"{job_id}.pdf")
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex[:12]
+
+    def submit(self, job_id: str, textbook_name: str, filename: str) -> Dict:
+        """
+        upload_path(job_id)에 저장된 PDF로 업로드 작업을 큐에 추가
+
+        교재의 현재 리비전을 고정하는 Pinecone 호출이 있으므로 이벤트 루프에서는 스레드로 호출합니다.
+        """
+        now = time.time()
+        job = {
+            'id': job_id,
+            'textbook_name': textbook_name,
+            'filename': filename,
+            'revision': int(now),
+            'status': 'queued',
+            'stage': 'queued',
+            'chunks_done': 0,
+            'chunks_total': 0,
+            'created_at': now,
+            'started_at': None,
+            'embedding_started_at': None,
+            'finished_at': None,
+            'error': None,
+            'dedup': None,
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+
+        # 업로드 도중 Pinecone에 올라가는 새 리비전 청크가 검색에 섞이지 않도록
+        # 지금 서비스 중인 리비전을 먼저 고정 (네트워크 호출이 있으므로 스레드에서 호출)
+        try:
+            self.rag.pin_active_revision(textbook_name)
+        except Exception as e:
+            logger.exception("Error pinning active revision", extra={"fields": {"job_id": job_id}})
+            self._mark_finished(job_id, 'failed', str(e))
+            return self.status(job_id)
+
+        args = (job_id, self.upload_path(job_id), textbook_name, job['revision'])
+        executor = self._executor
+        try:
+            future = executor.submit(_run_ingest_job, *args)
+        except BrokenProcessPool:
+            # 이전 작업에서 작업 프로세스가 죽은 경우: 풀을 새로 만들어 한 번 더 시도
+            self._replace_executor(executor)
+            executor = self._executor
+            try:
+                future = executor.submit(_run_ingest_job, *args)
+            except Exception as e:
+                logger.exception("Error submitting ingest job", extra={"fields": {"job_id": job_id}})
+                self._mark_finished(job_id, 'failed', str(e))
+                return self.status(job_id)
+
+        future.add_done_callback(lambda f: self._finish(job_id, f, executor))
+        return self.status(job_id)
+
+    def _drain_progress(self):
+        """작업 프로세스가 보낸 진행 상황을 작업 상태에 반영"""
+        while True:
+            try:
+                job_id, stage, done, total = self._progress_queue.get()
+            except (EOFError, OSError):
+                return
+
+            now = time.time()
+            with self._lock:
+                job = self.jobs.get(job_id)
+                # 완료 처리가 시작된 뒤 늦게 도착한 진행 상황은 무시
+                if job is None or job['status'] not in ('queued', 'running') or job['stage'] == 'activating':
+                    continue
+                if job['started_at'] is None:
+                    job['status'] = 'running'
+                    job['started_at'] = now
+                if stage == 'embedding' and job['embedding_started_at'] is None:
+                    job['embedding_started_at'] = now
+                job['stage'] = stage
+                job['chunks_done'] = done
+                job['chunks_total'] = total
+
+    def _finish(self, job_id: str, future, executor: ProcessPoolExecutor):
+        """작업 완료 처리: 성공 시 새 리비전을 활성화"""
+        with self._lock:
+            job = self.jobs[job_id]
+
+        try:
+            result = future.result()
+            with self._lock:
+                job['stage'] = 'activating'
+                job['chunks_done'] = job['chunks_total'] = result['chunks']
+                job['dedup'] = result.get('dedup')
+            self.rag.activate_revision(job['textbook_name'], job['revision'])
+            status, error = 'succeeded', None
+            self._notify_activated(job)
+        except Exception as e:
+            logger.exception("Error in ingest job", extra={"fields": {"job_id": job_id}})
+            status, error = 'failed', str(e)
+            if isinstance(e, BrokenProcessPool):
+                self._replace_executor(executor)
+            self._discard_partial(job)
+
+        self._mark_finished(job_id, status, error)
+
+    def _notify_activated(self, job: Dict):
+        """활성화 콜백 실행 (콜백 오류는 이미 활성화된 작업을 실패로 만들지 않음)"""
+        if self.on_activated is None:
+            return
+        try:
+            self.on_activated(job['textbook_name'], job['revision'])
+        except Exception:
+            logger.exception("Error in on_activated callback", extra={"fields": {"job_id": job['id']}})
+
+    def _discard_partial(self, job: Dict):
+        """실패한 작업이 중간까지 올린 리비전의 청크와 벡터를 삭제"""
+        try:
+            self.rag.discard_revision(job['textbook_name'], job['revision'])
+        except Exception:
+            logger.exception("Error discarding failed revision", extra={"fields": {"job_id": job['id']}})
+
+    def _mark_finished(self, job_id: str, status: str, error: Optional[str]):
+        with self._lock:
+            job = self.jobs[job_id]
+            job['status'] = status
+            job['stage'] = 'done' if status == 'succeeded' else 'failed'
+            job['error'] = error
+            job['finished_at'] = time.time()
+
+        try:
+            os.remove(self.upload_path(job_id))
+        except OSError:
+            pass
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """작업 상태 (처리량: 초당 청크 수, eta_seconds: 예상 남은 시간)"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+
+        throughput = None
+        eta = None
+        if job['embedding_started_at'] and job['chunks_done']:
+            end = job['finished_at'] or time.time()
+            elapsed = max(end - job['embedding_started_at'], 1e-6)
+            throughput = job['chunks_done'] / elapsed
+            if job['status'] == 'running':
+                eta = (job['chunks_total'] - job['chunks_done']) / throughput
+
+        job['throughput_chunks_per_sec'] = round(throughput, 2) if throughput else None
+        job['eta_seconds'] = round(eta, 1) if eta is not None else None
+        del job['embedding_started_at']
+        return job
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            job_ids = list(self.jobs)
+        return [self.status(job_id) for job_id in reversed(job_ids)]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
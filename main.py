@@ -1,15 +1,30 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from answer_cache import AnswerCache
+from compression import JSONGZipMiddleware
+from extractive import extractive_answer
+from ingest_jobs import IngestJobManager
+from static_assets import StaticAssets
+from tracing import TraceMiddleware, annotate, current_trace, setup_logging, span
 import os
 from dotenv import load_dotenv
-from rag_system import RAGSystem
+from rag_system import RAGSystem, run_blocking
+from outbound_scheduler import BATCH
 import json
 import asyncio
+import hmac
+import logging
+import shutil
+import time
 
 load_dotenv()
 
+# JSON 구조화 로그 (출력은 별도 스레드에서 처리)
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # FastAPI 앱 생성
 app = FastAPI(title="디지털 광고 마케팅 챗봇")
 
@@ -22,338 +37,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# JSON 응답 gzip 압축 (스트리밍 응답과 정적 파일은 제외)
+app.add_middleware(JSONGZipMiddleware, minimum_size=500)
+
+# /chat, /admin 요청별 trace (단계별 소요 시간 로그, X-Trace-Id 응답 헤더)
+app.add_middleware(TraceMiddleware)
+
 # RAG 시스템 초기화
 rag_system = RAGSystem(
     openai_api_key=os.getenv("OPENAI_API_KEY"),
     pinecone_api_key=os.getenv("PINECONE_API_KEY"),
-    pinecone_env=os.getenv("PINECONE_ENV", "us-east-1")
+    pinecone_env=os.getenv("PINECONE_ENV", "us-east-1"),
+    chunk_store_path=os.getenv("CHUNK_STORE_PATH", "chunk_store.db"),
+    transport_mode=os.getenv("RAG_TRANSPORT", "live"),
+    fixture_path=os.getenv("RAG_FIXTURE_PATH", "fixtures/rag_fixtures.jsonl"),
+    replay_latency=os.getenv("RAG_REPLAY_LATENCY", "0") == "1",
+    rate_limits=json.loads(os.getenv("OPENAI_RATE_LIMITS") or "{}")
 )
 
+# 채팅 UI 정적 파일 (build_static.py로 미리 압축된 파일을 메모리에서 전송)
+static_assets = StaticAssets()
+
 @app.get("/", response_class=HTMLResponse)
-async def home():
+async def home(request: Request):
     """메인 채팅 페이지"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="ko">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>디지털 광고 마케팅 챗봇</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                height: 100vh;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-            }
-            
-            .container {
-                width: 90%;
-                max-width: 800px;
-                height: 90vh;
-                background: white;
-                border-radius: 20px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                display: flex;
-                flex-direction: column;
-                overflow: hidden;
-            }
-            
-            .header {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 20px;
-                text-align: center;
-            }
-            
-            .header h1 {
-                font-size: 24px;
-                margin-bottom: 5px;
-            }
-            
-            .header p {
-                font-size: 14px;
-                opacity: 0.9;
-            }
-            
-            .chat-container {
-                flex: 1;
-                overflow-y: auto;
-                padding: 20px;
-                background: #f8f9fa;
-            }
-            
-            .message {
-                margin-bottom: 15px;
-                display: flex;
-                animation: fadeIn 0.3s ease-in;
-            }
-            
-            @keyframes fadeIn {
-                from { opacity: 0; transform: translateY(10px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-            
-            .message.user {
-                justify-content: flex-end;
-            }
-            
-            .message.bot {
-                justify-content: flex-start;
-            }
-            
-            .message-content {
-                max-width: 70%;
-                padding: 12px 16px;
-                border-radius: 18px;
-                word-wrap: break-word;
-            }
-            
-            .message.user .message-content {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-            }
-            
-            .message.bot .message-content {
-                background: white;
-                color: #333;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            }
-            
-            .input-container {
-                padding: 20px;
-                background: white;
-                border-top: 1px solid #e0e0e0;
-                display: flex;
-                gap: 10px;
-            }
-            
-            #user-input {
-                flex: 1;
-                padding: 12px 16px;
-                border: 2px solid #e0e0e0;
-                border-radius: 25px;
-                font-size: 14px;
-                outline: none;
-                transition: border-color 0.3s;
-            }
-            
-            #user-input:focus {
-                border-color: #667eea;
-            }
-            
-            #send-btn {
-                padding: 12px 30px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border: none;
-                border-radius: 25px;
-                cursor: pointer;
-                font-size: 14px;
-                font-weight: 600;
-                transition: transform 0.2s;
-            }
-            
-            #send-btn:hover {
-                transform: scale(1.05);
-            }
-            
-            #send-btn:disabled {
-                opacity: 0.5;
-                cursor: not-allowed;
-            }
-            
-            .typing-indicator {
-                display: none;
-                padding: 12px 16px;
-                background: white;
-                border-radius: 18px;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-                width: fit-content;
-            }
-            
-            .typing-indicator.active {
-                display: block;
-            }
-            
-            .typing-indicator span {
-                display: inline-block;
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-                background: #667eea;
-                margin: 0 2px;
-                animation: typing 1.4s infinite;
-            }
-            
-            .typing-indicator span:nth-child(2) {
-                animation-delay: 0.2s;
-            }
-            
-            .typing-indicator span:nth-child(3) {
-                animation-delay: 0.4s;
-            }
-            
-            @keyframes typing {
-                0%, 60%, 100% { transform: translateY(0); }
-                30% { transform: translateY(-10px); }
-            }
-            
-            .suggestions {
-                display: flex;
-                flex-wrap: wrap;
-                gap: 10px;
-                padding: 10px 20px;
-                background: #f8f9fa;
-            }
-            
-            .suggestion-btn {
-                padding: 8px 16px;
-                background: white;
-                border: 2px solid #667eea;
-                color: #667eea;
-                border-radius: 20px;
-                cursor: pointer;
-                font-size: 13px;
-                transition: all 0.3s;
-            }
-            
-            .suggestion-btn:hover {
-                background: #667eea;
-                color: white;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🚀 디지털 광고 마케팅 전문가</h1>
-                <p>네이버 · 구글 · 메타 광고에 대해 무엇이든 물어보세요!</p>
-            </div>
-            
-            <div class="suggestions">
-                <button class="suggestion-btn" onclick="askQuestion('네이버 파워링크 품질지수 개선 방법은?')">
-                    네이버 품질지수 개선
-                </button>
-                <button class="suggestion-btn" onclick="askQuestion('구글 애즈 키워드 매칭 유형 설명해줘')">
-                    구글 키워드 매칭
-                </button>
-                <button class="suggestion-btn" onclick="askQuestion('메타 광고 타겟팅 설정 방법')">
-                    메타 타겟팅
-                </button>
-            </div>
-            
-            <div class="chat-container" id="chat-container">
-                <div class="message bot">
-                    <div class="message-content">
-                        안녕하세요! 저는 검색광고와 SNS광고 전문 상담 AI입니다. 
-                        네이버, 구글, 메타 광고에 대해 궁금한 점을 물어보세요! 😊
-                    </div>
-                </div>
-                <div class="typing-indicator" id="typing-indicator">
-                    <span></span>
-                    <span></span>
-                    <span></span>
-                </div>
-            </div>
-            
-            <div class="input-container">
-                <input 
-                    type="text" 
-                    id="user-input" 
-                    placeholder="메시지를 입력하세요..."
-                    onkeypress="if(event.key==='Enter') sendMessage()"
-                />
-                <button id="send-btn" onclick="sendMessage()">전송</button>
-            </div>
-        </div>
-        
-        <script>
-            const chatContainer = document.getElementById('chat-container');
-            const userInput = document.getElementById('user-input');
-            const sendBtn = document.getElementById('send-btn');
-            const typingIndicator = document.getElementById('typing-indicator');
-            
-            function scrollToBottom() {
-                chatContainer.scrollTop = chatContainer.scrollHeight;
-            }
-            
-            function addMessage(content, isUser) {
-                const messageDiv = document.createElement('div');
-                messageDiv.className = `message ${isUser ? 'user' : 'bot'}`;
-                
-                const contentDiv = document.createElement('div');
-                contentDiv.className = 'message-content';
-                contentDiv.textContent = content;
-                
-                messageDiv.appendChild(contentDiv);
-                
-                // typing indicator 전에 삽입
-                chatContainer.insertBefore(messageDiv, typingIndicator);
-                scrollToBottom();
-            }
-            
-            function askQuestion(question) {
-                userInput.value = question;
-                sendMessage();
-            }
-            
-            async function sendMessage() {
-                const message = userInput.value.trim();
-                if (!message) return;
-                
-                // 사용자 메시지 추가
-                addMessage(message, true);
-                userInput.value = '';
-                
-                // UI 비활성화
-                sendBtn.disabled = true;
-                userInput.disabled = true;
-                typingIndicator.classList.add('active');
-                scrollToBottom();
-                
-                try {
-                    const response = await fetch('/chat', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({ message: message })
-                    });
-                    
-                    const data = await response.json();
-                    
-                    // 봇 응답 추가
-                    typingIndicator.classList.remove('active');
-                    addMessage(data.response, false);
-                    
-                } catch (error) {
-                    console.error('Error:', error);
-                    typingIndicator.classList.remove('active');
-                    addMessage('죄송합니다. 오류가 발생했습니다. 다시 시도해주세요.', false);
-                }
-                
-                // UI 활성화
-                sendBtn.disabled = false;
-                userInput.disabled = false;
-                userInput.focus();
-            }
-            
-            // 초기 포커스
-            userInput.focus();
-        </script>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html_content)
+    return static_assets.response(request, "index.html")
+
+@app.get("/static/{filename}")
+async def static_file(request: Request, filename: str):
+    """내용 해시가 붙은 CSS/JS 파일 (장기 캐시)"""
+    return static_assets.response(request, filename)
+
+# 응답 마감 시간 (초) - 넘기면 검색된 교재 문장으로 만든 답변을 먼저 반환 (0이면 마감 없음)
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", 8))
+# 마감 후에도 응답 생성을 끝까지 진행해 답변 캐시에 저장할지 여부
+CHAT_BACKGROUND_COMPLETION = os.getenv("CHAT_BACKGROUND_COMPLETION", "1") == "1"
+
+answer_cache = AnswerCache(
+    max_size=int(os.getenv("ANSWER_CACHE_SIZE", 256)),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", 3600))
+)
+# /chat 답변 출처별 건수 (generated: 생성 완료, extractive: 마감 초과 대체 답변, cache: 캐시 적중)
+answer_counts = {"generated": 0, "extractive": 0, "cache": 0}
+_background_generations = set()
 
 @app.post("/chat")
 async def chat(request: Request):
@@ -362,14 +88,235 @@ async def chat(request: Request):
     user_message = data.get("message", "")
     
     try:
-        # 1. 관련 문서 검색
-        relevant_docs = rag_system.search_similar_content(user_message, top_k=3)
+        response = answer_cache.get(user_message)
+        if response is not None:
+            source = "cache"
+        else:
+            cache_version = answer_cache.version
+            response, source = await answer_question(
+                user_message, deadline=CHAT_DEADLINE_SECONDS or None
+            )
+            if source == "generated":
+                # 생성 중에 교재가 교체되었다면 이전 교재 기반 답변이므로 저장하지 않음
+                answer_cache.put(user_message, response, version=cache_version)
         
-        # 2. 컨텍스트 구성
-        context = _build_context(relevant_docs)
+        answer_counts[source] += 1
+        current = current_trace()
+        if current is not None:
+            current.attrs["answer_source"] = source
+        return {"response": response}
         
-        # 3. 프롬프트 생성
-        system_prompt = f"""당신은 검색광고마케터1급과 SNS광고마케터1급 자격증 교재를 기반으로 
+    except Exception:
+        logger.exception("Error in chat")
+        return {"response": "죄송합니다. 오류가 발생했습니다. 다시 시도해주세요."}
+
+async def answer_question(user_message, deadline=None):
+    """
+    /chat 파이프라인: 검색 → 컨텍스트 구성 → 프롬프트 생성 → 응답 생성
+    
+    각 단계는 현재 trace의 span으로 기록됩니다 (trace 밖에서 호출하면 기록 없음).
+    
+    Args:
+        user_message: 사용자 질문
+        deadline: 마감 시간 (초, 검색 시작부터). 그때까지 응답 생성이 끝나지 않으면
+                  검색된 청크에서 뽑은 문장으로 답변을 구성해 바로 반환
+    
+    Returns:
+        (답변, 출처) - 출처는 "generated" 또는 "extractive"
+    """
+    started = time.perf_counter()
+    cache_version = answer_cache.version
+    
+    # 1. 관련 문서 검색 (임베딩 → 벡터 검색 → 원문 복원)
+    # 한도 대기와 동기 SDK 호출이 이벤트 루프를 막지 않도록 비동기/스레드로 실행
+    with span("embed", chars=len(user_message)):
+        query_vector = await rag_system.create_embedding_async(user_message)
+    with span("query", top_k=3):
+        matches = await run_blocking(rag_system.query_matches, query_vector, top_k=3)
+        annotate(matches=len(matches))
+    with span("hydrate"):
+        relevant_docs = await run_blocking(rag_system.hydrate, matches, limit=3)
+        annotate(docs=len(relevant_docs))
+    
+    # 2. 컨텍스트 구성
+    with span("context"):
+        context = _build_context(relevant_docs)
+        annotate(context_chars=len(context))
+    
+    # 3. 프롬프트 생성
+    with span("prompt"):
+        full_prompt = _build_prompt(user_message, context)
+        annotate(prompt_chars=len(full_prompt))
+    
+    # 4. 응답 생성 (마감 시간을 넘기면 생성은 그대로 두고 대체 답변 사용)
+    with span("generate", deadline=deadline):
+        generation = asyncio.ensure_future(rag_system.generate_response(full_prompt))
+        remaining = None
+        if deadline is not None:
+            remaining = max(0.0, deadline - (time.perf_counter() - started))
+        try:
+            response = await asyncio.wait_for(asyncio.shield(generation), timeout=remaining)
+            annotate(response_chars=len(response))
+            return response, "generated"
+        except asyncio.TimeoutError:
+            annotate(timed_out=True)
+    
+    with span("extractive"):
+        response = extractive_answer(user_message, relevant_docs)
+        annotate(response_chars=len(response))
+    _finish_in_background(user_message, generation, cache_version)
+    return response, "extractive"
+
+def _finish_in_background(user_message, generation, cache_version):
+    """마감을 넘긴 응답 생성이 끝나면 답변 캐시에 저장 (비활성화 시 결과를 버림)"""
+    if not CHAT_BACKGROUND_COMPLETION:
+        # 이미 스레드에서 진행 중인 API 호출은 멈출 수 없으므로 결과만 버림
+        generation.cancel()
+        return
+    
+    _background_generations.add(generation)
+    
+    def done(task):
+        _background_generations.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error("Error in background generation", exc_info=task.exception())
+            return
+        answer_cache.put(user_message, task.result(), version=cache_version)
+    
+    generation.add_done_callback(done)
+
+# 배치 질의 설정
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", 100))
+BATCH_MAX_TOP_K = 10
+BATCH_GENERATION_CONCURRENCY = int(os.getenv("BATCH_GENERATION_CONCURRENCY", 4))
+
+@app.post("/chat/batch")
+async def chat_batch(request: Request):
+    """
+    모의고사 문항 등 여러 질문을 한 번에 처리하는 배치 API
+    
+    요청: {"questions": ["...", "..."], "top_k": 3}
+    응답: 질문별 결과가 완료되는 순서대로 한 줄씩 전송되는 NDJSON
+          {"index": 0, "question": "...", "response": "..."}
+          {"index": 1, "question": "...", "error": "..."}
+          마지막 줄은 {"done": true, ...} 요약
+    """
+    data = await request.json()
+    questions = data.get("questions") or []
+    top_k = data.get("top_k", 3)
+    
+    if not isinstance(questions, list) or not questions:
+        return JSONResponse({"error": "questions 목록이 필요합니다"}, status_code=400)
+    # bool은 int의 하위 타입이므로 따로 제외
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or not 1 <= top_k <= BATCH_MAX_TOP_K:
+        return JSONResponse(
+            {"error": f"top_k는 1~{BATCH_MAX_TOP_K} 사이의 정수여야 합니다"},
+            status_code=400
+        )
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return JSONResponse(
+            {"error": f"한 번에 최대 {BATCH_MAX_QUESTIONS}개 질문까지 처리할 수 있습니다"},
+            status_code=400
+        )
+    
+    return StreamingResponse(
+        _answer_batch([str(q).strip() for q in questions], top_k),
+        media_type="application/x-ndjson"
+    )
+
+async def _answer_batch(questions, top_k):
+    """배치 질문을 처리하며 완료되는 대로 NDJSON 한 줄씩 생성"""
+    started = time.perf_counter()
+    errors = {i: "빈 질문입니다" for i, q in enumerate(questions) if not q}
+    valid = [i for i, q in enumerate(questions) if q]
+    
+    def line(payload):
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+    
+    # 1. 모든 질문을 한 번의 임베딩 요청으로 변환
+    vectors = {}
+    if valid:
+        try:
+            with span("embed", questions=len(valid)):
+                embeddings = await rag_system.create_embeddings_async(
+                    [questions[i] for i in valid], priority=BATCH
+                )
+            vectors = dict(zip(valid, embeddings))
+        except Exception:
+            logger.exception("Error in batch embedding")
+            for i in valid:
+                errors[i] = "임베딩 생성에 실패했습니다"
+    
+    # 2. 벡터 검색을 동시에 실행
+    indices = list(vectors)
+    with span("query", questions=len(indices), top_k=top_k):
+        results = await asyncio.gather(
+            *(run_blocking(rag_system.query_matches, vectors[i], top_k) for i in indices),
+            return_exceptions=True
+        )
+    matches = {}
+    for i, result in zip(indices, results):
+        if isinstance(result, Exception):
+            logger.error("Error in batch query", exc_info=result, extra={"fields": {"index": i}})
+            errors[i] = "관련 문서 검색에 실패했습니다"
+        else:
+            matches[i] = result
+    
+    # 3. 여러 질문이 공유하는 청크는 한 번만 복원
+    docs = {}
+    if matches:
+        try:
+            with span("hydrate", questions=len(matches)):
+                hydrated = await run_blocking(rag_system.hydrate_many, list(matches.values()), top_k)
+            docs = dict(zip(matches, hydrated))
+        except Exception:
+            logger.exception("Error in batch hydrate")
+            for i in matches:
+                errors[i] = "관련 문서 검색에 실패했습니다"
+    
+    for i in sorted(errors):
+        yield line({"index": i, "question": questions[i], "error": errors[i]})
+    
+    # 4. 응답 생성은 동시 실행 수를 제한하고, 끝나는 순서대로 전송
+    semaphore = asyncio.Semaphore(BATCH_GENERATION_CONCURRENCY)
+    
+    async def answer(i):
+        async with semaphore:
+            try:
+                prompt = _build_prompt(questions[i], _build_context(docs[i]))
+                with span("generate", index=i, prompt_chars=len(prompt)):
+                    response = await rag_system.generate_response(prompt, priority=BATCH)
+                return {"index": i, "question": questions[i], "response": response}
+            except Exception:
+                logger.exception("Error in batch generation", extra={"fields": {"index": i}})
+                return {"index": i, "question": questions[i], "error": "응답 생성에 실패했습니다"}
+    
+    failed = len(errors)
+    tasks = [asyncio.ensure_future(answer(i)) for i in docs]
+    try:
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            if "error" in result:
+                failed += 1
+            yield line(result)
+    finally:
+        # 클라이언트가 연결을 끊어 스트림이 닫히면 남은 생성 요청이 공용 한도를 쓰지 않도록 취소
+        # (세마포어·스케줄러에서 대기 중인 요청은 바로 빠지고, 이미 보낸 호출은 결과만 버림)
+        for task in tasks:
+            task.cancel()
+    
+    yield line({
+        "done": True,
+        "total": len(questions),
+        "failed": failed,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    })
+
+def _build_prompt(user_message, context):
+    """검색된 컨텍스트와 사용자 질문으로 전체 프롬프트 구성"""
+    system_prompt = f"""당신은 검색광고마케터1급과 SNS광고마케터1급 자격증 교재를 기반으로 
 학습한 디지털 마케팅 전문가입니다.
 
 아래는 사용자 질문과 관련된 교재 내용입니다:
@@ -389,16 +336,7 @@ async def chat(request: Request):
 - 구글: 검색광고, 디스플레이, YouTube, 쇼핑
 - 메타: 페이스북, 인스타그램 캠페인"""
 
-        full_prompt = f"{system_prompt}\n\n사용자 질문: {user_message}"
-        
-        # 4. 응답 생성
-        response = await rag_system.generate_response(full_prompt)
-        
-        return {"response": response}
-        
-    except Exception as e:
-        print(f"Error in chat: {e}")
-        return {"response": "죄송합니다. 오류가 발생했습니다. 다시 시도해주세요."}
+    return f"{system_prompt}\n\n사용자 질문: {user_message}"
 
 def _build_context(docs):
     """검색된 문서들로 컨텍스트 구성"""
@@ -411,6 +349,101 @@ def _build_context(docs):
     
     return "\n".join(context_parts)
 
+# 관리자 API 설정 (ADMIN_TOKEN이 없으면 관리자 API 비활성화)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+INGEST_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", "uploads")
+_ingest_jobs = None
+
+def _require_admin(request: Request):
+    """X-Admin-Token 헤더 확인"""
+    token = request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="관리자 권한이 필요합니다")
+
+def _get_ingest_jobs():
+    """업로드 작업 관리자 (작업 프로세스는 첫 업로드 때 생성)"""
+    global _ingest_jobs
+    if _ingest_jobs is None:
+        _ingest_jobs = IngestJobManager(
+            rag_system, upload_dir=INGEST_UPLOAD_DIR, on_activated=_on_revision_activated
+        )
+    return _ingest_jobs
+
+def _on_revision_activated(textbook_name, revision):
+    """교재가 교체되면 이전 교재로 만든 답변이 캐시에서 나가지 않도록 비움"""
+    cleared = len(answer_cache)
+    answer_cache.clear()
+    logger.info("답변 캐시 비움", extra={"fields": {
+        "source": textbook_name, "revision": revision, "cleared": cleared
+    }})
+
+def _save_upload(src, path):
+    with open(path, "wb") as f:
+        shutil.copyfileobj(src, f)
+
+@app.post("/admin/ingest", status_code=202)
+async def admin_ingest(
+    request: Request,
+    file: UploadFile = File(...),
+    textbook_name: str = Form(...)
+):
+    """
+    교재 PDF 업로드 후 업로드 작업 등록
+    
+    추출·임베딩은 별도 작업 프로세스에서 진행되며, 완료되면 새 내용으로 한 번에 교체됩니다.
+    진행 상황은 GET /admin/jobs/{job_id}로 확인합니다.
+    """
+    _require_admin(request)
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="PDF 파일만 업로드할 수 있습니다")
+    
+    jobs = _get_ingest_jobs()
+    job_id = jobs.new_job_id()
+    await run_blocking(_save_upload, file.file, jobs.upload_path(job_id))
+    return await run_blocking(jobs.submit, job_id, textbook_name.strip(), file.filename)
+
+@app.get("/admin/jobs")
+async def admin_jobs(request: Request):
+    """업로드 작업 목록 (최신순)"""
+    _require_admin(request)
+    return {"jobs": _ingest_jobs.list() if _ingest_jobs else []}
+
+@app.get("/admin/jobs/{job_id}")
+async def admin_job_status(request: Request, job_id: str):
+    """업로드 작업 상태 (단계, 완료 청크 수, 처리량, 예상 남은 시간)"""
+    _require_admin(request)
+    job = _ingest_jobs.status(job_id) if _ingest_jobs else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+    return job
+
+@app.get("/admin/scheduler")
+async def admin_scheduler(request: Request):
+    """OpenAI 요청 스케줄러 상태 (우선순위별 대기 시간, 모델별 한도 잔여량)"""
+    _require_admin(request)
+    if rag_system.scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **rag_system.scheduler.stats()}
+
+@app.get("/admin/answers")
+async def admin_answers(request: Request):
+    """/chat 답변 통계 (마감 초과로 대체 답변을 보낸 비율, 캐시 적중 수)"""
+    _require_admin(request)
+    total = sum(answer_counts.values())
+    return {
+        "total": total,
+        **answer_counts,
+        "fallback_ratio": round(answer_counts["extractive"] / total, 4) if total else 0.0,
+        "deadline_seconds": CHAT_DEADLINE_SECONDS,
+        "cache_size": len(answer_cache),
+        "background_pending": len(_background_generations),
+    }
+
+@app.on_event("shutdown")
+async def shutdown():
+    if _ingest_jobs is not None:
+        _ingest_jobs.shutdown()
+
 @app.get("/health")
 async def health_check():
     """서버 상태 확인"""
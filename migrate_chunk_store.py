@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import time
+from statistics import median
+
+from dotenv import load_dotenv
+from chunk_store import SHARED_SOURCE
+from rag_system import RAGSystem
+
+load_dotenv()
+
+
+def backfill(rag: RAGSystem, strip_text: bool = False, batch_size: int = 100):
+    """
+    기존 Pinecone 인덱스의 메타데이터 원문을 로컬 청크 저장소로 옮김
+
+    Args:
+        rag: RAG 시스템
+        strip_text: True이면 옮긴 뒤 Pinecone 메타데이터에서 text 필드를 제거
+        batch_size: fetch 한 번에 가져올 id 개수
+    """
+    print("📦 로컬 청크 저장소 백필 시작...")
+    copied = 0
+    stripped = 0
+    sources = set()
+
+    # serverless 인덱스의 id 목록을 페이지 단위로 순회
+    for ids in rag.index.list(limit=batch_size):
+        fetched = rag.index.fetch(ids=list(ids))
+
+        items = []
+        reupserts = []
+        for doc_id, vector in fetched['vectors'].items():
+            metadata = dict(vector['metadata'] or {})
+            text = metadata.pop('text', None)
+            if text is None:
+                continue
+            items.append((doc_id, text, metadata))
+            if strip_text:
+                reupserts.append((doc_id, vector['values'], metadata))
+
+        if items:
+            rag.chunk_store.put_many(items)
+            copied += len(items)
+            sources.update(metadata.get('source', '') for _, _, metadata in items)
+
+        # Pinecone 메타데이터 필드는 update로 삭제할 수 없으므로 기존 벡터로 다시 upsert
+        if reupserts:
+            rag.index.upsert(vectors=reupserts)
+            stripped += len(reupserts)
+
+        print(f"   진행: {copied}개 청크 복사됨")
+
+    # 활성 리비전이 기록되지 않은 교재는 지금 서비스 중인 리비전(기존 청크는 0)으로 고정
+    # (고정하지 않으면 이후 업로드 중인 새 리비전 청크가 검색에 섞일 수 있음)
+    # (공유 청크는 참조하는 교재 리비전으로 판단하므로 고정 대상이 아님)
+    for source in sorted(sources - {SHARED_SOURCE}):
+        revision = rag.pin_active_revision(source)
+        print(f"   📌 {source}: 활성 리비전 {revision}")
+
+    print(f"✅ 백필 완료: {copied}개 복사, {stripped}개 메타데이터 텍스트 제거")
+
+
+def measure(rag: RAGSystem, queries: list, top_k: int = 3, repeat: int = 5):
+    """
+    메타데이터 포함 조회와 id/점수만 조회하는 방식의 응답 크기·지연시간 비교
+
+    임베딩은 질문마다 한 번만 만들고, 같은 벡터로 두 방식을 번갈아 조회합니다.
+    응답 크기는 직렬화된 응답(JSON) 바이트 수로 측정합니다.
+    """
+    stats = {
+        'before': {'bytes': [], 'ms': []},
+        'after': {'bytes': [], 'ms': []},
+    }
+
+    for query in queries:
+        vector = rag.create_embedding(query)
+        for _ in range(repeat):
+            # 기존 방식: 메타데이터(원문 포함)까지 받아옴
+            start = time.perf_counter()
+            results = rag.index.query(vector=vector, top_k=top_k, include_metadata=True)
+            stats['before']['ms'].append((time.perf_counter() - start) * 1000)
+            stats['before']['bytes'].append(_payload_size(results))
+
+            # 새 방식: id/점수만 받아오고 로컬 저장소에서 복원
+            start = time.perf_counter()
+            results = rag.index.query(vector=vector, top_k=top_k, include_metadata=False)
+            rag.hydrate([{'id': m['id'], 'score': m['score']} for m in results['matches']])
+            stats['after']['ms'].append((time.perf_counter() - start) * 1000)
+            stats['after']['bytes'].append(_payload_size(results))
+
+    print(f"\n📊 조회 비교 (질문 {len(queries)}개 x {repeat}회, top_k={top_k})")
+    for label, name in (('before', '메타데이터 포함'), ('after', 'id/점수 + 로컬 복원')):
+        sizes = stats[label]['bytes']
+        latencies = sorted(stats[label]['ms'])
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+        print(f"   {name}: 평균 응답 {sum(sizes) / len(sizes):,.0f} bytes, "
+              f"지연 p50 {median(latencies):.1f}ms / p95 {p95:.1f}ms")
+    return stats
+
+
+def _payload_size(results) -> int:
+    data = results.to_dict() if hasattr(results, 'to_dict') else results
+    return len(json.dumps(data, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pinecone 메타데이터 원문을 로컬 청크 저장소로 이전")
+    parser.add_argument("--strip-text", action="store_true",
+                        help="백필 후 Pinecone 메타데이터에서 text 필드 제거 "
+                             "(CHUNK_STORE_PATH가 재배포 후에도 유지되는 배포에서만 사용)")
+    parser.add_argument("--measure", action="store_true",
+                        help="백필 후 조회 응답 크기와 지연시간 비교")
+    parser.add_argument("--skip-backfill", action="store_true",
+                        help="백필 없이 측정만 실행")
+    args = parser.parse_args()
+    if args.strip_text and args.measure:
+        # 텍스트를 지운 뒤에는 '이전' 응답 크기를 측정할 수 없음
+        parser.error("--measure는 --strip-text 전에 따로 실행해주세요")
+
+    rag = RAGSystem(
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        pinecone_api_key=os.getenv("PINECONE_API_KEY"),
+        pinecone_env=os.getenv("PINECONE_ENV", "us-east-1"),
+        chunk_store_path=os.getenv("CHUNK_STORE_PATH", "chunk_store.db")
+    )
+
+    if not args.skip_backfill:
+        backfill(rag, strip_text=args.strip_text)
+
+    if args.measure:
+        measure(rag, [
+            "네이버 파워링크 품질지수 개선 방법은?",
+            "구글 애즈 키워드 매칭 유형 설명해줘",
+            "메타 광고 타겟팅 설정 방법",
+        ])
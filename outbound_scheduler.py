@@ -0,0 +1,281 @@
+import asyncio
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# 우선순위 (숫자가 작을수록 먼저 처리)
+INTERACTIVE = 0   # /chat 등 사용자가 기다리는 요청
+BATCH = 1         # /chat/batch
+BACKGROUND = 2    # 교재 업로드, 캐시 워밍 등
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+# 우선순위별로 버킷에 남겨둬야 하는 여유분 (용량 대비 비율)
+# 낮은 우선순위 요청은 여유분을 건드리지 못하므로 대화형 요청 몫이 항상 남음
+RESERVE_FRACTION = {INTERACTIVE: 0.0, BATCH: 0.1, BACKGROUND: 0.3}
+
+# 모델별 기본 한도 (응답 헤더를 받으면 실제 한도로 갱신됨)
+DEFAULT_LIMITS = {
+    "gpt-4": {"rpm": 500, "tpm": 10000},
+    "gpt-3.5-turbo": {"rpm": 3500, "tpm": 60000},
+    "text-embedding-ada-002": {"rpm": 3000, "tpm": 1000000},
+}
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """x-ratelimit-reset-* 헤더 값("1s", "6m0s", "20ms" 등)을 초 단위로 변환"""
+    if not value:
+        return None
+    matches = _DURATION_PATTERN.findall(value)
+    if not matches:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in matches)
+
+
+class TokenBucket:
+    """분당 한도를 초당 비율로 채우는 토큰 버킷 (스레드 안전성은 호출자가 보장)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, reserve: float) -> float:
+        """amount를 꺼낸 뒤에도 reserve 이상 남으려면 기다려야 하는 시간 (초)"""
+        # 한 번에 용량보다 큰 요청은 버킷이 가득 찼을 때 보내도록 제한
+        amount = min(amount, self.capacity * (1 - reserve))
+        shortfall = amount + self.capacity * reserve - self.level
+        if shortfall <= 0:
+            return 0.0
+        return shortfall * 60 / self.capacity
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float]):
+        """응답 헤더의 실제 한도/잔여량으로 보정"""
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            # 서버가 알려준 잔여량은 다른 프로세스 사용분까지 반영된 값이므로 더 작으면 따름
+            self.level = min(self.level, float(remaining))
+            if remaining <= 0 and reset:
+                # 리셋 시점에 맞춰 다시 채워지도록 음수로 둠
+                self.level = -reset * self.capacity / 60
+
+
+class OutboundScheduler:
+    """
+    OpenAI 요청 수(RPM)·토큰 수(TPM) 한도를 지키는 우선순위 스케줄러
+
+    모델별로 RPM/TPM 토큰 버킷을 두고, 요청은 우선순위 순으로 대기합니다.
+    같은 모델의 대기열에서는 항상 가장 높은 우선순위(같으면 먼저 온) 요청만
+    버킷을 사용할 수 있어, 대량 업로드가 대화형 요청을 굶기지 않습니다.
+    응답의 x-ratelimit-* 헤더로 실제 한도와 잔여량을 계속 보정합니다.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, float]] = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._waiters: Dict[str, list] = {}
+        self._sequence = itertools.count()
+        self._queue_times = {priority: deque(maxlen=1000) for priority in PRIORITY_NAMES}
+        self._waiting = {priority: 0 for priority in PRIORITY_NAMES}
+        # acquire_async로 대기 중인 코루틴 (이벤트 루프, 깨울 이벤트)
+        self._async_waiters = set()
+
+    def _model_buckets(self, model: str) -> Dict[str, TokenBucket]:
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            limits = self.limits.get(model, {"rpm": 500, "tpm": 10000})
+            buckets = {"requests": TokenBucket(limits["rpm"]), "tokens": TokenBucket(limits["tpm"])}
+            self._buckets[model] = buckets
+        return buckets
+
+    def _enqueue(self, model: str, priority: int) -> tuple:
+        """모델 대기열에 순번표를 넣음 (self._cond 보유 상태에서 호출)"""
+        ticket = (priority, next(self._sequence))
+        self._model_buckets(model)
+        heapq.heappush(self._waiters.setdefault(model, []), ticket)
+        self._waiting[priority] += 1
+        return ticket
+
+    def _try_take(self, model: str, ticket: tuple, tokens: int) -> Optional[float]:
+        """
+        차례가 된 요청이면 버킷에서 한도를 꺼냄 (self._cond 보유 상태에서 호출)
+
+        Returns:
+            0: 확보 완료, 양수: 버킷이 찰 때까지 기다려야 하는 시간(초), None: 아직 차례가 아님
+        """
+        waiters = self._waiters[model]
+        if waiters[0] != ticket:
+            return None
+        buckets = self._buckets[model]
+        reserve = RESERVE_FRACTION.get(ticket[0], 0.0)
+        now = time.monotonic()
+        for bucket in buckets.values():
+            bucket.refill(now)
+        wait = max(
+            buckets["requests"].wait_time(1, reserve),
+            buckets["tokens"].wait_time(tokens, reserve),
+        )
+        if wait > 0:
+            return wait
+        buckets["requests"].level -= 1
+        buckets["tokens"].level -= tokens
+        heapq.heappop(waiters)
+        return 0.0
+
+    def _dequeue(self, model: str, ticket: tuple):
+        """대기 종료 처리 (self._cond 보유 상태에서 호출)"""
+        waiters = self._waiters[model]
+        self._waiting[ticket[0]] -= 1
+        if ticket in waiters:
+            waiters.remove(ticket)
+            heapq.heapify(waiters)
+        self._notify()
+
+    def _notify(self):
+        """대기 중인 스레드와 코루틴을 모두 깨움 (self._cond 보유 상태에서 호출)"""
+        self._cond.notify_all()
+        for loop, event in list(self._async_waiters):
+            loop.call_soon_threadsafe(event.set)
+
+    def _record_queue_time(self, priority: int, queued: float):
+        with self._cond:
+            self._queue_times[priority].append(queued)
+
+    def acquire(self, model: str, tokens: int, priority: int = INTERACTIVE) -> float:
+        """
+        요청 1건과 tokens만큼의 한도를 확보할 때까지 대기 (호출한 스레드를 막음)
+
+        업로드 작업 프로세스처럼 동기 코드에서 사용합니다.
+        이벤트 루프에서는 스레드를 점유하지 않는 acquire_async를 사용해야 합니다.
+
+        Returns:
+            대기한 시간 (초)
+        """
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(model, priority)
+            try:
+                while True:
+                    wait = self._try_take(model, ticket, tokens)
+                    if wait == 0:
+                        break
+                    # 차례가 아니면 앞 요청이 끝날 때까지, 차례면 버킷이 찰 때까지 대기
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._dequeue(model, ticket)
+
+        queued = time.monotonic() - start
+        self._record_queue_time(priority, queued)
+        return queued
+
+    async def acquire_async(self, model: str, tokens: int, priority: int = INTERACTIVE) -> float:
+        """
+        acquire의 비동기 버전
+
+        대기하는 동안 스레드 풀의 스레드를 점유하지 않으므로, 많은 배치 요청이
+        한도를 기다리고 있어도 대화형 요청은 바로 우선순위 대기열에 들어갈 수 있습니다.
+
+        Returns:
+            대기한 시간 (초)
+        """
+        start = time.monotonic()
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            ticket = self._enqueue(model, priority)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                # 상태를 확인하기 전에 이벤트를 지워야 그 사이의 변경 알림을 놓치지 않음
+                waiter[1].clear()
+                with self._cond:
+                    wait = self._try_take(model, ticket, tokens)
+                if wait == 0:
+                    break
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+                self._dequeue(model, ticket)
+
+        queued = time.monotonic() - start
+        self._record_queue_time(priority, queued)
+        return queued
+
+    def update_from_headers(self, model: str, headers):
+        """응답(또는 429 오류)의 x-ratelimit-* 헤더로 버킷 보정"""
+        if headers is None:
+            return
+
+        def number(name):
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except ValueError:
+                return None
+
+        with self._cond:
+            buckets = self._model_buckets(model)
+            now = time.monotonic()
+            for kind in ("requests", "tokens"):
+                buckets[kind].refill(now)
+                buckets[kind].sync(
+                    number(f"x-ratelimit-limit-{kind}"),
+                    number(f"x-ratelimit-remaining-{kind}"),
+                    parse_reset(headers.get(f"x-ratelimit-reset-{kind}")),
+                )
+            self._notify()
+
+    def penalize(self, model: str, retry_after: Optional[float]):
+        """429를 받았을 때 retry_after(없으면 1초) 동안 새 요청을 보내지 않도록 버킷을 비움"""
+        with self._cond:
+            buckets = self._model_buckets(model)
+            delay = retry_after or 1.0
+            for bucket in buckets.values():
+                bucket.refill(time.monotonic())
+                bucket.level = min(bucket.level, -delay * bucket.capacity / 60)
+
+    def stats(self) -> Dict:
+        """우선순위별 대기 시간 통계 (ms)와 모델별 버킷 상태"""
+        with self._cond:
+            samples = {priority: sorted(times) for priority, times in self._queue_times.items()}
+            waiting = dict(self._waiting)
+            buckets = {
+                model: {
+                    kind: {"level": round(bucket.level, 1), "capacity": bucket.capacity}
+                    for kind, bucket in model_buckets.items()
+                }
+                for model, model_buckets in self._buckets.items()
+            }
+
+        queue_ms = {}
+        for priority, times in samples.items():
+            entry = {"count": len(times), "waiting": waiting[priority]}
+            if times:
+                entry.update({
+                    "mean": round(sum(times) / len(times) * 1000, 1),
+                    "p50": round(times[len(times) // 2] * 1000, 1),
+                    "p95": round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 1),
+                    "max": round(times[-1] * 1000, 1),
+                })
+            queue_ms[PRIORITY_NAMES[priority]] = entry
+
+        return {"queue_ms": queue_ms, "buckets": buckets}
@@ -7,24 +7,126 @@ except ImportError:
     import pinecone
     PINECONE_VERSION = 2
 
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 from typing import List, Dict
+import asyncio
+import contextvars
+import functools
+import hashlib
+import logging
 import tiktoken
 import time
 
+from chunk_store import SHARED_SOURCE, ChunkStore, revision_refs
+from outbound_scheduler import INTERACTIVE, OutboundScheduler, parse_reset
+from tracing import annotate
+from transport import LiveTransport, RecordingTransport, ReplayTransport
+
+logger = logging.getLogger(__name__)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    동기 SDK 호출을 스레드 풀에서 실행하여 이벤트 루프를 막지 않도록 함
+    
+    현재 trace/span이 스레드에서도 이어지도록 contextvars를 복사해 실행합니다.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(context.run, func, *args, **kwargs))
+
+
 class RAGSystem:
-    def __init__(self, openai_api_key: str, pinecone_api_key: str, pinecone_env: str = "us-east-1"):
-        """RAG 시스템 초기화"""
+    # 교재 재업로드 중에는 아직 활성화되지 않은 리비전 청크가 검색될 수 있으므로
+    # id/점수를 넉넉히 받아온 뒤 복원 단계에서 걸러내고 top_k개만 사용
+    QUERY_OVERFETCH = 2
+    
+    # 429 응답 시 스케줄러를 거쳐 다시 시도하는 횟수
+    MAX_RATE_LIMIT_RETRIES = 3
+    
+    # 교재별 활성 리비전 표식을 저장하는 Pinecone 네임스페이스
+    # (검색은 기본 네임스페이스에서만 하므로 표식 벡터는 검색 결과에 나오지 않음)
+    REVISION_NAMESPACE = "revisions"
+    
+    # 같은 교재의 활성 리비전을 Pinecone 표식으로 다시 확인하는 최소 간격 (초)
+    REVISION_RECHECK_SECONDS = 10
+    
+    def __init__(self, openai_api_key: str, pinecone_api_key: str, pinecone_env: str = "us-east-1",
+                 chunk_store_path: str = "chunk_store.db", transport_mode: str = "live",
+                 fixture_path: str = "fixtures/rag_fixtures.jsonl", replay_latency: bool = False,
+                 rate_limits: Dict = None):
+        """
+        RAG 시스템 초기화
         
-        # OpenAI 클라이언트
-        self.openai_client = OpenAI(api_key=openai_api_key)
+        Args:
+            transport_mode: "live"(기본), "record"(호출 결과를 픽스처에 기록),
+                            "replay"(네트워크 없이 픽스처로 응답)
+            fixture_path: 녹화/재생에 사용할 픽스처 파일 경로
+            replay_latency: 재생 시 기록된 지연시간을 재현할지 여부
+            rate_limits: 모델별 분당 한도 {"gpt-4": {"rpm": 500, "tpm": 10000}, ...}
+        """
         
         # 인덱스 이름
         self.index_name = "ad-marketing-textbook"
         
+        if transport_mode == "replay":
+            logger.info("재생 모드", extra={"fields": {"fixture_path": fixture_path}})
+            self.openai_client = None
+            self.index = None
+            # 재생 모드에서는 실제 한도가 없으므로 스케줄링하지 않음
+            self.scheduler = None
+            self.transport = ReplayTransport(fixture_path, replay_latency=replay_latency)
+            # 녹화 당시 사용된 청크만으로 구성된 메모리 저장소
+            self.chunk_store = ChunkStore(":memory:")
+            self.chunk_store.put_many([
+                (doc_id, chunk.get('text', ''), chunk)
+                for doc_id, chunk in self.transport.chunks.items()
+            ])
+            for source, revision in {
+                source: revision
+                for chunk in self.transport.chunks.values()
+                for source, revision in revision_refs(chunk)
+            }.items():
+                self.chunk_store.activate_revision(source, revision)
+        else:
+            # OpenAI 클라이언트 (재시도는 SDK 대신 스케줄러가 우선순위에 맞춰 처리)
+            self.openai_client = OpenAI(api_key=openai_api_key, max_retries=0)
+            self.index = self._connect_index(pinecone_api_key, pinecone_env)
+            
+            # OpenAI 요청 한도(RPM/TPM) 스케줄러
+            self.scheduler = OutboundScheduler(rate_limits)
+            
+            self.transport = LiveTransport(
+                self.openai_client, self.index, on_headers=self.scheduler.update_from_headers
+            )
+            if transport_mode == "record":
+                logger.info("녹화 모드", extra={"fields": {"fixture_path": fixture_path}})
+                self.transport = RecordingTransport(self.transport, fixture_path)
+            
+            # 로컬 청크 저장소 (검색 결과 원문은 여기서 조회, 없으면 Pinecone 메타데이터에서 채움)
+            self.chunk_store = ChunkStore(chunk_store_path)
+            logger.info("로컬 청크 저장소 로드", extra={"fields": {"chunks": len(self.chunk_store)}})
+        
+        # 원문을 찾지 못한 id (리비전 교체 시 초기화)
+        self._unresolved = set()
+        # 교재별 마지막 리비전 표식 확인 시각
+        self._revision_checked: Dict[str, float] = {}
+        
+    @functools.cached_property
+    def encoding(self):
+        """토큰 카운터 (인코딩 파일을 내려받으므로 처음 사용할 때 로드, 실패하면 None)"""
+        try:
+            return tiktoken.encoding_for_model("gpt-3.5-turbo")
+        except Exception:
+            # 네트워크 없는 재생 모드 등: 캐시(TIKTOKEN_CACHE_DIR)가 없으면 추정치 사용
+            logger.warning("tiktoken 인코딩을 불러오지 못해 토큰 수를 추정합니다", exc_info=True)
+            return None
+    
+    def _connect_index(self, pinecone_api_key: str, pinecone_env: str):
+        """Pinecone 인덱스 연결 (없으면 생성)"""
         # Pinecone 버전별 초기화
         if PINECONE_VERSION == 3:
-            print("📌 Pinecone 3.x 버전 사용 중...")
+            logger.info("Pinecone 3.x 버전 사용 중")
             # Pinecone 초기화 (새로운 방식)
             self.pc = Pinecone(api_key=pinecone_api_key)
             
@@ -32,7 +134,7 @@ class RAGSystem:
             existing_indexes = [index.name for index in self.pc.list_indexes()]
             
             if self.index_name not in existing_indexes:
-                print(f"인덱스 '{self.index_name}' 생성 중...")
+                logger.info("인덱스 생성 중", extra={"fields": {"index": self.index_name}})
                 self.pc.create_index(
                     name=self.index_name,
                     dimension=1536,
@@ -43,38 +145,92 @@ class RAGSystem:
                     )
                 )
                 # 인덱스 생성 대기
-                print("인덱스 생성 대기 중 (약 10초)...")
+                logger.info("인덱스 생성 대기 중 (약 10초)")
                 time.sleep(10)
             
-            self.index = self.pc.Index(self.index_name)
+            return self.pc.Index(self.index_name)
         else:
-            print("📌 Pinecone 2.x 버전 사용 중...")
+            logger.info("Pinecone 2.x 버전 사용 중")
             # Pinecone 초기화 (이전 방식)
             pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
             
             # Pinecone 인덱스 연결 또는 생성
             if self.index_name not in pinecone.list_indexes():
-                print(f"인덱스 '{self.index_name}' 생성 중...")
+                logger.info("인덱스 생성 중", extra={"fields": {"index": self.index_name}})
                 pinecone.create_index(
                     name=self.index_name,
                     dimension=1536,
                     metric="cosine"
                 )
-                print("인덱스 생성 대기 중 (약 10초)...")
+                logger.info("인덱스 생성 대기 중 (약 10초)")
                 time.sleep(10)
             
-            self.index = pinecone.Index(self.index_name)
+            return pinecone.Index(self.index_name)
+    
+    def _call_openai(self, model: str, tokens: int, priority: int, func, /, *args, **kwargs):
+        """
+        스케줄러에서 한도를 확보한 뒤 OpenAI 호출 (호출한 스레드에서 대기)
         
-        # 토큰 카운터
-        self.encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        429를 받으면 응답 헤더로 버킷을 보정하고 같은 우선순위로 다시 대기합니다.
+        (func에 model=... 키워드를 그대로 넘길 수 있도록 앞 인자는 위치 전용)
+        """
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            if self.scheduler is not None:
+                queued = self.scheduler.acquire(model, tokens, priority)
+                annotate(queue_ms=round(queued * 1000, 1), attempts=attempt + 1)
+            try:
+                return func(*args, **kwargs)
+            except RateLimitError as e:
+                self._handle_rate_limit(model, e, attempt)
+    
+    async def _call_openai_async(self, model: str, tokens: int, priority: int, func, /, *args, **kwargs):
+        """
+        _call_openai의 비동기 버전
         
-    def create_embedding(self, text: str) -> List[float]:
+        한도 대기는 이벤트 루프에서 하고, 한도를 확보한 뒤의 HTTP 호출만 스레드 풀로 보냅니다.
+        대기 중인 요청이 스레드를 점유하지 않으므로 배치 요청이 많이 쌓여도
+        대화형 요청이 스레드 풀을 기다리지 않고 바로 우선순위 대기열에 들어갑니다.
+        """
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            if self.scheduler is not None:
+                queued = await self.scheduler.acquire_async(model, tokens, priority)
+                annotate(queue_ms=round(queued * 1000, 1), attempts=attempt + 1)
+            try:
+                return await run_blocking(func, *args, **kwargs)
+            except RateLimitError as e:
+                self._handle_rate_limit(model, e, attempt)
+    
+    def _handle_rate_limit(self, model: str, error: RateLimitError, attempt: int):
+        """429 응답으로 버킷을 보정 (다시 시도할 수 없으면 예외를 그대로 전달)"""
+        # 크레딧 부족은 기다려도 해결되지 않음
+        if (self.scheduler is None or attempt == self.MAX_RATE_LIMIT_RETRIES
+                or getattr(error, 'code', None) == 'insufficient_quota'):
+            raise error
+        headers = error.response.headers
+        self.scheduler.update_from_headers(model, headers)
+        self.scheduler.penalize(model, parse_reset(headers.get('retry-after')))
+    
+    def create_embedding(self, text: str, priority: int = INTERACTIVE) -> List[float]:
         """텍스트를 벡터로 변환"""
-        response = self.openai_client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=text
-        )
-        return response.data[0].embedding
+        return self.create_embeddings([text], priority=priority)[0]
+    
+    def create_embeddings(self, texts: List[str], priority: int = INTERACTIVE) -> List[List[float]]:
+        """여러 텍스트를 한 번의 요청으로 벡터로 변환 (입력 순서 유지)"""
+        model = "text-embedding-ada-002"
+        tokens = sum(self.count_tokens(text) for text in texts)
+        annotate(model=model, prompt_tokens=tokens)
+        return self._call_openai(model, tokens, priority, self.transport.embed, model, texts)
+    
+    async def create_embedding_async(self, text: str, priority: int = INTERACTIVE) -> List[float]:
+        """create_embedding의 비동기 버전 (이벤트 루프에서 사용)"""
+        return (await self.create_embeddings_async([text], priority=priority))[0]
+    
+    async def create_embeddings_async(self, texts: List[str], priority: int = INTERACTIVE) -> List[List[float]]:
+        """create_embeddings의 비동기 버전 (한도 대기 중 스레드를 점유하지 않음)"""
+        model = "text-embedding-ada-002"
+        tokens = sum(self.count_tokens(text) for text in texts)
+        annotate(model=model, prompt_tokens=tokens)
+        return await self._call_openai_async(model, tokens, priority, self.transport.embed, model, texts)
     
     def search_similar_content(self, query: str, top_k: int = 3) -> List[Dict]:
         """
@@ -90,46 +246,238 @@ class RAGSystem:
         # 질문을 벡터로 변환
         query_vector = self.create_embedding(query)
         
-        # Pinecone에서 유사한 내용 검색
-        results = self.index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_metadata=True
+        # Pinecone에서는 id와 점수만 받아오고, 원문은 로컬 저장소에서 복원
+        matches = self.query_matches(query_vector, top_k=top_k)
+        return self.hydrate(matches, limit=top_k)
+    
+    def query_matches(self, vector: List[float], top_k: int = 3) -> List[Dict]:
+        """
+        벡터와 유사한 청크의 id와 점수만 조회 (메타데이터 미포함)
+        
+        Returns:
+            [{'id': ..., 'score': ...}, ...] (최대 top_k * QUERY_OVERFETCH개)
+        """
+        return self.transport.query(vector, top_k * self.QUERY_OVERFETCH)
+    
+    def hydrate(self, matches: List[Dict], limit: int = None) -> List[Dict]:
+        """
+        검색 결과(id, 점수)에 로컬 저장소의 원문과 메타데이터를 채워 넣음
+        
+        로컬 저장소에 없는 id는 Pinecone에서 메타데이터를 가져와 채우고,
+        이후 조회를 위해 저장소에도 기록합니다. 원문을 찾을 수 없거나
+        활성 리비전이 아닌 청크는 결과에서 제외됩니다.
+        
+        Args:
+            matches: query_matches 결과
+            limit: 반환할 최대 개수
+        """
+        return self.hydrate_many([matches], limit=limit)[0]
+    
+    def hydrate_many(self, match_lists: List[List[Dict]], limit: int = None) -> List[List[Dict]]:
+        """
+        여러 검색 결과를 한 번에 복원
+        
+        여러 질문이 같은 청크를 가리키더라도 저장소 조회와 Pinecone fetch는
+        중복 없이 한 번씩만 수행합니다.
+        """
+        unique_ids = list(dict.fromkeys(
+            match['id'] for matches in match_lists for match in matches
+        ))
+        chunks = self.chunk_store.get_many(unique_ids)
+        
+        # 이미 복원에 실패한 id(업로드 중인 리비전 등)는 다시 fetch하지 않음
+        missing = [
+            doc_id for doc_id in unique_ids
+            if doc_id not in chunks and doc_id not in self._unresolved
+        ]
+        if missing:
+            chunks.update(self._backfill_chunks(missing))
+        self._sync_active_revisions(chunks.values())
+        self.transport.record_chunks({
+            doc_id: chunk for doc_id, chunk in chunks.items() if self.chunk_store.is_active(chunk)
+        })
+        
+        results = []
+        for matches in match_lists:
+            docs = []
+            for match in matches:
+                chunk = chunks.get(match['id'])
+                if chunk is None or not self.chunk_store.is_active(chunk):
+                    continue
+                source = chunk.get('source', '')
+                if source == SHARED_SOURCE:
+                    # 여러 교재에 똑같이 나오는 청크는 해당 교재를 모두 출처로 표시
+                    source = ", ".join(chunk.get('sources') or [])
+                docs.append({
+                    'id': match['id'],
+                    'text': chunk.get('text', ''),
+                    'source': source,
+                    'chapter': chunk.get('chapter', ''),
+                    'score': match['score']
+                })
+            results.append(docs[:limit])
+        
+        return results
+    
+    def _backfill_chunks(self, doc_ids: List[str]) -> Dict[str, Dict]:
+        """로컬 저장소에 없는 청크를 Pinecone 메타데이터에서 가져와 저장"""
+        fetched = self.transport.fetch(doc_ids)
+        
+        items = []
+        for doc_id, metadata in fetched.items():
+            text = metadata.pop('text', None)
+            if text is not None:
+                items.append((doc_id, text, metadata))
+        
+        if items:
+            self.chunk_store.put_many(items)
+        
+        chunks = self.chunk_store.get_many(doc_ids)
+        self._unresolved.update(doc_id for doc_id in doc_ids if doc_id not in chunks)
+        return chunks
+    
+    def _sync_active_revisions(self, chunks):
+        """
+        활성 리비전이 로컬 저장소와 다를 수 있는 교재를 다시 확인
+        
+        - 활성 리비전을 모르는 교재: 저장소가 비어 있는 서버(Railway 재배포 등)
+        - 활성 리비전보다 새 리비전의 청크가 검색된 교재: 다른 프로세스
+          (python upload_textbook.py 등)가 새 리비전을 활성화했을 수 있음
+        
+        먼저 SQLite 파일을 다시 읽고(같은 파일을 쓰는 프로세스의 활성화 반영), 그래도
+        다르면 Pinecone의 리비전 표식을 따릅니다. 업로드 중인 리비전도 새 리비전으로
+        보이므로 교재마다 REVISION_RECHECK_SECONDS에 한 번만 확인합니다.
+        """
+        def stale_sources():
+            found = set()
+            for chunk in chunks:
+                for source, revision in revision_refs(chunk):
+                    active = self.chunk_store.active_revision(source)
+                    if active is None or revision > active:
+                        found.add(source)
+            return found
+        
+        chunks = list(chunks)
+        now = time.monotonic()
+        due = {
+            source for source in stale_sources()
+            if now - self._revision_checked.get(source, float('-inf')) >= self.REVISION_RECHECK_SECONDS
+        }
+        if not due:
+            return
+        for source in due:
+            self._revision_checked[source] = now
+        
+        self.chunk_store.reload()
+        due &= stale_sources()
+        if not due:
+            self._unresolved = set()
+            return
+        
+        try:
+            markers = self._fetch_revision_markers(sorted(due))
+        except Exception:
+            logger.warning("리비전 표식 조회 실패", exc_info=True)
+            return
+        for source, revision in markers.items():
+            if self.chunk_store.active_revision(source) == revision:
+                continue
+            # 이전 리비전 벡터는 활성화한 프로세스가 이미 삭제했으므로 로컬 저장소만 정리
+            self.chunk_store.activate_revision(source, revision)
+            self._unresolved = set()
+            logger.info("활성 리비전 갱신", extra={"fields": {"source": source, "revision": revision}})
+    
+    @staticmethod
+    def make_marker_id(source: str) -> str:
+        """교재별 리비전 표식의 벡터 id"""
+        return f"revision_{hashlib.md5(source.encode('utf-8')).hexdigest()[:8]}"
+    
+    def _fetch_revision_markers(self, sources: List[str]) -> Dict[str, int]:
+        """Pinecone에 기록된 교재별 활성 리비전 {교재명: 리비전} (표식이 없는 교재는 제외)"""
+        ids = {self.make_marker_id(source): source for source in sources}
+        fetched = self.transport.fetch(list(ids), namespace=self.REVISION_NAMESPACE)
+        return {
+            ids[marker_id]: int(metadata['revision'])
+            for marker_id, metadata in fetched.items()
+            if marker_id in ids and 'revision' in metadata
+        }
+    
+    def _write_revision_marker(self, source: str, revision: int):
+        """교재의 활성 리비전을 Pinecone 표식으로 기록 (빈 저장소에서 복원하는 원본)"""
+        # Pinecone은 0 벡터를 허용하지 않으므로 첫 성분만 1인 벡터 사용
+        vector = [1.0] + [0.0] * 1535
+        self.transport.upsert(
+            [(self.make_marker_id(source), vector, {'source': source, 'revision': revision})],
+            namespace=self.REVISION_NAMESPACE
         )
+    
+    def pin_active_revision(self, source: str) -> int:
+        """
+        교재의 현재 서비스 중인 리비전을 활성 리비전으로 고정
+        
+        새 리비전 업로드를 시작하기 전에 호출합니다. 활성 리비전이 기록되지 않은
+        교재는 모든 리비전을 받아들이는 것이 아니라 리비전 0만 사용하므로, 그 전에
+        실제로 서비스 중인 리비전을 기록해 두어야 업로드 도중 새 청크가 섞이지 않습니다.
+        청크는 삭제하지 않습니다.
+        
+        Returns:
+            고정된 리비전 (Pinecone 표식 → 로컬 저장소에 가장 많은 리비전 → 0 순으로 결정)
+        """
+        revision = self.chunk_store.active_revision(source)
+        if revision is not None:
+            return revision
         
-        # 결과 포맷팅
-        docs = []
-        for match in results['matches']:
-            docs.append({
-                'text': match['metadata'].get('text', ''),
-                'source': match['metadata'].get('source', ''),
-                'chapter': match['metadata'].get('chapter', ''),
-                'score': match['score']
-            })
+        markers = self._fetch_revision_markers([source])
+        if source in markers:
+            revision = markers[source]
+        else:
+            counts = self.chunk_store.revision_counts(source)
+            revision = max(counts, key=lambda r: (counts[r], r)) if counts else 0
+            self._write_revision_marker(source, revision)
         
-        return docs
+        self.chunk_store.set_active(source, revision)
+        logger.info("활성 리비전 고정", extra={"fields": {"source": source, "revision": revision}})
+        return revision
     
-    async def generate_response(self, prompt: str) -> str:
+    async def generate_response(self, prompt: str, priority: int = INTERACTIVE) -> str:
         """
         OpenAI를 사용하여 응답 생성
         
         Args:
             prompt: 컨텍스트가 포함된 전체 프롬프트
+            priority: 스케줄러 우선순위 (INTERACTIVE / BATCH / BACKGROUND)
             
         Returns:
             생성된 응답
         """
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4",  # 또는 "gpt-3.5-turbo"
+        model = "gpt-4"  # 또는 "gpt-3.5-turbo"
+        system_message = "당신은 디지털 광고 마케팅 전문가입니다."
+        max_tokens = 1500
+        
+        # span에는 실제 프롬프트 토큰 수를, 스케줄러 예약량(max_tokens 포함)은 따로 기록
+        # (TPM 한도는 요청 시점에 max_tokens까지 포함해 계산됨)
+        prompt_tokens = self.count_tokens(system_message) + self.count_tokens(prompt)
+        reserved_tokens = prompt_tokens + max_tokens
+        annotate(model=model, prompt_tokens=prompt_tokens)
+        if self.scheduler is not None:
+            annotate(reserved_tokens=reserved_tokens)
+        
+        # 한도 대기는 이벤트 루프에서, 동기 클라이언트 호출은 스레드에서 실행
+        response = await self._call_openai_async(
+            model, reserved_tokens, priority,
+            self.transport.chat,
+            model=model,
             messages=[
-                {"role": "system", "content": "당신은 디지털 광고 마케팅 전문가입니다."},
+                {"role": "system", "content": system_message},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7,
-            max_tokens=1500
+            max_tokens=max_tokens
         )
-        
-        return response.choices[0].message.content
+        # API가 알려준 사용량(usage_*)은 LiveTransport가 기록하고, 여기서는 재생 모드에서도
+        # 같은 기준으로 비교할 수 있도록 직접 센 값을 기록
+        annotate(completion_tokens=self.count_tokens(response))
+        return response
     
     def add_document(self, text: str, metadata: Dict):
         """
@@ -139,26 +487,85 @@ class RAGSystem:
             text: 추가할 텍스트
             metadata: 메타데이터 (source, chapter 등)
         """
+        self.add_documents([text], [metadata])
+    
+    def add_documents(self, texts: List[str], metadatas: List[Dict], priority: int = INTERACTIVE):
+        """
+        여러 교재 청크를 한 번의 임베딩 요청과 한 번의 upsert로 추가
+        
+        Args:
+            texts: 추가할 텍스트 리스트
+            metadatas: 각 텍스트의 메타데이터 리스트
+            priority: 임베딩 요청의 스케줄러 우선순위
+        """
         # 텍스트를 벡터로 변환
-        vector = self.create_embedding(text)
+        vectors = self.create_embeddings(texts, priority=priority)
+        
+        items = []
+        upserts = []
+        for text, vector, metadata in zip(texts, vectors, metadatas):
+            doc_id = self.make_doc_id(metadata)
+            items.append((doc_id, text, metadata))
+            # 원문은 Pinecone 메타데이터에도 저장 (로컬 저장소가 비어 있는 서버가 가져올 원본)
+            # 검색은 include_metadata=False로 하므로 조회 응답 크기에는 영향 없음
+            upserts.append((doc_id, vector, {**metadata, 'text': text}))
+        
+        self.chunk_store.put_many(items)
+        self.transport.upsert(upserts)
+    
+    def activate_revision(self, source: str, revision: int):
+        """
+        교재의 새 리비전을 활성화하고 이전 리비전 벡터를 삭제
+        
+        로컬 저장소의 전환은 한 번에 일어나므로, 전환 직후 Pinecone에 남아 있는
+        이전 벡터가 검색되더라도 복원 단계에서 걸러집니다.
+        """
+        stale_ids = self.chunk_store.activate_revision(source, revision)
+        self._unresolved = set()
+        # 다른 서버(저장소가 비어 있는 배포 등)도 같은 리비전을 쓰도록 표식을 먼저 기록한 뒤 삭제
+        self._write_revision_marker(source, revision)
+        
+        for start in range(0, len(stale_ids), 1000):
+            self.transport.delete(stale_ids[start:start + 1000])
         
-        # 고유 ID 생성 (ASCII만 허용하므로 해시 사용)
-        import hashlib
+        logger.info(
+            "리비전 활성화",
+            extra={"fields": {"source": source, "revision": revision, "deleted_chunks": len(stale_ids)}}
+        )
+    
+    def discard_revision(self, source: str, revision: int):
+        """
+        업로드에 실패한 리비전의 청크와 벡터를 삭제
+        
+        활성화되지 않은 청크는 검색 결과에서 걸러지지만, 남아 있으면
+        여유분으로 더 받아오는 검색 결과 자리를 차지하므로 바로 정리합니다.
+        """
+        discarded = self.chunk_store.discard_revision(source, revision)
+        
+        for start in range(0, len(discarded), 1000):
+            self.transport.delete(discarded[start:start + 1000])
+        
+        logger.info(
+            "실패한 리비전 삭제",
+            extra={"fields": {"source": source, "revision": revision, "deleted_chunks": len(discarded)}}
+        )
+    
+    @staticmethod
+    def make_doc_id(metadata: Dict) -> str:
+        """메타데이터로부터 고유 ID 생성 (ASCII만 허용하므로 해시 사용)"""
         source = metadata.get('source', 'unknown')
         chunk_id = metadata.get('chunk_id', 0)
+        revision = metadata.get('revision', 0)
         
         # 한글을 포함한 source를 해시로 변환
         source_hash = hashlib.md5(source.encode('utf-8')).hexdigest()[:8]
-        doc_id = f"doc_{source_hash}_{chunk_id}"
-        
-        # 메타데이터에 원본 텍스트 추가
-        metadata['text'] = text
-        
-        # Pinecone에 저장
-        self.index.upsert(
-            vectors=[(doc_id, vector, metadata)]
-        )
+        if revision:
+            return f"doc_{source_hash}_r{revision}_{chunk_id}"
+        return f"doc_{source_hash}_{chunk_id}"
     
     def count_tokens(self, text: str) -> int:
-        """텍스트의 토큰 수 계산"""
+        """텍스트의 토큰 수 계산 (인코딩을 불러올 수 없으면 UTF-8 3바이트당 1토큰으로 추정)"""
+        if self.encoding is None:
+            # 한글 한 글자(3바이트)가 대략 1토큰, 영문은 약간 많게 추정됨
+            return (len(text.encode('utf-8')) + 2) // 3
         return len(self.encoding.encode(text))
\ No newline at end of file
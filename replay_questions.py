@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import json
+import os
+from statistics import mean, median
+
+STAGES = ["embed", "query", "hydrate", "context", "prompt", "generate"]
+
+
+def load_questions(path: str) -> list:
+    """질문 목록 읽기 (.json 배열 또는 한 줄에 질문 하나인 텍스트 파일)"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            return [str(q) for q in json.load(f)]
+        return [line.strip() for line in f if line.strip()]
+
+
+async def run_questions(questions: list) -> list:
+    """질문들을 /chat과 같은 파이프라인으로 하나씩 실행하고 단계별 시간을 수집"""
+    # 환경변수로 전송 모드를 정한 뒤 import해야 main의 RAG 시스템에 반영됨
+    from main import answer_question
+    from tracing import trace
+
+    results = []
+    for i, question in enumerate(questions, 1):
+        error = None
+        with trace("replay", index=i) as current:
+            try:
+                await answer_question(question)
+            except Exception as e:
+                error = str(e)
+        # 단계별 시간은 /chat과 같은 trace span에서 가져옴
+        timings = current.span_durations()
+        timings["total"] = current.duration_ms
+        results.append({"question": question, "timings": timings, "error": error})
+
+        status = f"❌ {error}" if error else "✅"
+        stages = " ".join(f"{stage}={timings[stage]:.1f}" for stage in STAGES if stage in timings)
+        print(f"[{i}/{len(questions)}] {status} total={timings['total']:.1f}ms {stages}")
+    return results
+
+
+def report(results: list):
+    """단계별 지연시간 요약 출력 (ms)"""
+    print(f"\n📊 단계별 소요 시간 (ms, 질문 {len(results)}개)")
+    print(f"   {'stage':<10}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+    for stage in STAGES + ["total"]:
+        values = sorted(r["timings"][stage] for r in results if stage in r["timings"])
+        if not values:
+            continue
+        p95 = values[max(0, int(round(len(values) * 0.95)) - 1)]
+        print(f"   {stage:<10}{mean(values):>10.1f}{median(values):>10.1f}{p95:>10.1f}{values[-1]:>10.1f}")
+
+    failed = sum(1 for r in results if r["error"])
+    if failed:
+        print(f"\n⚠️  실패 {failed}건")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="질문 세트를 /chat 파이프라인으로 녹화/재생하며 단계별 시간 측정")
+    parser.add_argument("questions", help="질문 파일 (.json 배열 또는 줄 단위 텍스트)")
+    parser.add_argument("--fixture", default="fixtures/rag_fixtures.jsonl", help="픽스처 파일 경로")
+    parser.add_argument("--record", action="store_true", help="실제 API를 호출하며 픽스처 녹화")
+    parser.add_argument("--latency", action="store_true", help="재생 시 녹화된 지연시간 재현")
+    parser.add_argument("--output", help="질문별 결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    os.environ["RAG_TRANSPORT"] = "record" if args.record else "replay"
+    os.environ["RAG_FIXTURE_PATH"] = args.fixture
+    os.environ["RAG_REPLAY_LATENCY"] = "1" if args.latency else "0"
+    # 질문별 trace 로그가 진행 상황 출력과 섞이지 않도록 경고 이상만 출력
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = asyncio.run(run_questions(load_questions(args.questions)))
+    report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
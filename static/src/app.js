@@ -0,0 +1,72 @@
+const chatContainer = document.getElementById('chat-container');
+const userInput = document.getElementById('user-input');
+const sendBtn = document.getElementById('send-btn');
+const typingIndicator = document.getElementById('typing-indicator');
+
+function scrollToBottom() {
+    chatContainer.scrollTop = chatContainer.scrollHeight;
+}
+
+function addMessage(content, isUser) {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${isUser ? 'user' : 'bot'}`;
+
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'message-content';
+    contentDiv.textContent = content;
+
+    messageDiv.appendChild(contentDiv);
+
+    // typing indicator 전에 삽입
+    chatContainer.insertBefore(messageDiv, typingIndicator);
+    scrollToBottom();
+}
+
+function askQuestion(question) {
+    userInput.value = question;
+    sendMessage();
+}
+
+async function sendMessage() {
+    const message = userInput.value.trim();
+    if (!message) return;
+
+    // 사용자 메시지 추가
+    addMessage(message, true);
+    userInput.value = '';
+
+    // UI 비활성화
+    sendBtn.disabled = true;
+    userInput.disabled = true;
+    typingIndicator.classList.add('active');
+    scrollToBottom();
+
+    try {
+        const response = await fetch('/chat', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ message: message })
+        });
+
+        const data = await response.json();
+
+        // 봇 응답 추가
+        typingIndicator.classList.remove('active');
+        addMessage(data.response, false);
+
+    } catch (error) {
+        console.error('Error:', error);
+        typingIndicator.classList.remove('active');
+        addMessage('죄송합니다. 오류가 발생했습니다. 다시 시도해주세요.', false);
+    }
+
+    // UI 활성화
+    sendBtn.disabled = false;
+    userInput.disabled = false;
+    userInput.focus();
+}
+
+// 초기 포커스
+userInput.focus();
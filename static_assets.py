@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+
+from fastapi import Request
+from fastapi.responses import Response
+
+import build_static
+
+logger = logging.getLogger(__name__)
+
+
+def accepted_encodings(request: Request) -> set:
+    """Accept-Encoding 헤더에서 허용된 인코딩 목록 (q=0은 제외)"""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+class StaticAssets:
+    """
+    빌드된 채팅 UI 정적 파일 서빙
+
+    build_static.py가 만든 manifest와 미리 압축된 파일을 시작 시 메모리에 올려두고,
+    요청의 Accept-Encoding에 맞는 압축본을 그대로 전송합니다.
+    ETag는 파일 내용 해시이며, If-None-Match가 일치하면 본문 없이 304를 반환합니다.
+    """
+
+    # 요청이 허용할 때 우선 선택할 압축 순서
+    ENCODING_PREFERENCE = ["br", "gzip"]
+    ETAG_SUFFIX = {"br": "-br", "gzip": "-gz", "identity": ""}
+
+    def __init__(self, dist_dir: str = build_static.DIST_DIR):
+        manifest_path = os.path.join(dist_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            # 배포 빌드 단계를 거치지 않은 경우(로컬 실행 등) 시작 시 한 번 빌드
+            logger.info("정적 파일 빌드 결과가 없어 새로 빌드합니다")
+            build_static.build()
+
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        self.files = {}
+        for name, entry in manifest.items():
+            bodies = {"identity": self._read(dist_dir, entry["file"])}
+            for encoding, variant in entry["encodings"].items():
+                bodies[encoding] = self._read(dist_dir, variant)
+            self.files[name] = {**entry, "bodies": bodies}
+
+    @staticmethod
+    def _read(dist_dir: str, filename: str) -> bytes:
+        with open(os.path.join(dist_dir, filename), "rb") as f:
+            return f.read()
+
+    def response(self, request: Request, name: str) -> Response:
+        """정적 파일 응답 생성 (압축 협상, ETag, 304 처리 포함)"""
+        entry = self.files.get(name)
+        if entry is None:
+            return Response(status_code=404)
+
+        encoding = "identity"
+        accepted = accepted_encodings(request)
+        for candidate in self.ENCODING_PREFERENCE:
+            if candidate in accepted and candidate in entry["bodies"]:
+                encoding = candidate
+                break
+
+        headers = {
+            "ETag": f'"{entry["etag"]}{self.ETAG_SUFFIX[encoding]}"',
+            "Cache-Control": (
+                "public, max-age=31536000, immutable" if entry["immutable"] else "no-cache"
+            ),
+            "Vary": "Accept-Encoding",
+        }
+
+        if self._not_modified(request, entry["etag"]):
+            return Response(status_code=304, headers=headers)
+
+        headers["Content-Type"] = entry["content_type"]
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=entry["bodies"][encoding], headers=headers)
+
+    def _not_modified(self, request: Request, etag: str) -> bool:
+        """If-None-Match에 같은 내용의 ETag(인코딩 무관)가 있으면 True"""
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+
+        variants = {f'"{etag}{suffix}"' for suffix in self.ETAG_SUFFIX.values()}
+        for tag in header.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in variants:
+                return True
+        return False
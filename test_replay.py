@@ -0,0 +1,85 @@
+"""
+네트워크 없이 /chat 파이프라인을 재생하는 회귀 테스트
+
+fixtures/test_replay.jsonl은 RecordingTransport 형식으로 기록된 작은 픽스처입니다.
+질문 2개에 대한 임베딩, 벡터 조회, 원문 fetch, 응답 생성 기록과 사용된 청크가 들어 있으며,
+응답 생성 기록은 전체 프롬프트로 찾으므로 검색 결과나 프롬프트 구성이 바뀌면 테스트가 실패합니다.
+(의도한 변경이라면 replay_questions.py --record로 픽스처를 다시 녹화)
+
+실행: pytest test_replay.py
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "test_replay.jsonl")
+
+EXPECTED = {
+    "품질지수란 무엇인가요?": {
+        "doc_ids": ["doc_a", "doc_b"],
+        "response": "품질지수는 광고의 품질을 나타내는 지표입니다.",
+    },
+    "메타 광고 맞춤 타겟 설정 방법": {
+        "doc_ids": ["doc_c", "doc_d"],
+        "response": "맞춤 타겟은 광고주 데이터로 잠재고객을 구성합니다.",
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def main_module():
+    # main은 import 시점의 환경변수로 RAG 시스템을 만들므로 먼저 재생 모드로 설정
+    saved = {key: os.environ.get(key) for key in ("RAG_TRANSPORT", "RAG_FIXTURE_PATH", "RAG_REPLAY_LATENCY")}
+    os.environ["RAG_TRANSPORT"] = "replay"
+    os.environ["RAG_FIXTURE_PATH"] = FIXTURE_PATH
+    os.environ["RAG_REPLAY_LATENCY"] = "0"
+    sys.modules.pop("main", None)
+    import main
+    yield main
+    sys.modules.pop("main", None)
+    for key, value in saved.items():
+        if value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
+
+
+@pytest.mark.parametrize("question", list(EXPECTED))
+def test_retrieval(main_module, question):
+    """검색 결과: 픽스처에 원문이 없는 id(doc_x)는 제외되고 출처 정보가 채워짐"""
+    docs = main_module.rag_system.search_similar_content(question, top_k=3)
+
+    assert [doc['id'] for doc in docs] == EXPECTED[question]["doc_ids"]
+    for doc in docs:
+        assert doc['text']
+        assert doc['source'] in ("검색광고마케터1급", "SNS광고마케터1급")
+        assert doc['chapter'].startswith("Chapter")
+
+
+def test_prompt_contains_context(main_module):
+    question = "품질지수란 무엇인가요?"
+    docs = main_module.rag_system.search_similar_content(question, top_k=3)
+    prompt = main_module._build_prompt(question, main_module._build_context(docs))
+
+    assert question in prompt
+    assert "[관련 내용 1]" in prompt and "[관련 내용 2]" in prompt
+    for doc in docs:
+        assert doc['text'] in prompt
+
+
+@pytest.mark.parametrize("question", list(EXPECTED))
+def test_answer_question(main_module, question):
+    """전체 파이프라인: 녹화된 프롬프트와 같아야 녹화된 응답이 재생됨"""
+    response, source = asyncio.run(main_module.answer_question(question))
+
+    assert source == "generated"
+    assert response == EXPECTED[question]["response"]
+
+
+def test_unrecorded_question_fails(main_module):
+    from transport import FixtureMissingError
+
+    with pytest.raises(FixtureMissingError):
+        asyncio.run(main_module.answer_question("녹화되지 않은 질문"))
@@ -0,0 +1,251 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# 느린 요청 기준 (ms) - 넘으면 span 전체를 slow_request 로그로 남김
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 5000))
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+_listener = None
+
+slow_logger = logging.getLogger("slow_request")
+
+
+class JsonFormatter(logging.Formatter):
+    """로그 레코드를 한 줄 JSON으로 변환 (extra={"fields": {...}} 값은 최상위 키로 병합)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    큐에 넣기 전 메시지와 예외만 문자열로 정리하는 QueueHandler
+
+    기본 QueueHandler는 예외 traceback을 메시지에 이어 붙이므로,
+    JSON의 exc 필드로 따로 남을 수 있도록 exc_text에 보관합니다.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _TraceIdFilter(logging.Filter):
+    """로그를 남기는 시점의 trace id를 레코드에 붙임 (큐로 넘어가기 전에 실행됨)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "trace_id"):
+            trace = _current_trace.get()
+            record.trace_id = trace.trace_id if trace else None
+        return True
+
+
+def setup_logging(level: str = None, slow_log_path: str = None):
+    """
+    JSON 구조화 로그 설정
+
+    로그는 QueueHandler로 큐에 넣기만 하고, 실제 출력(stdout/파일)은 별도 스레드의
+    QueueListener가 처리하므로 요청 처리 경로에서 I/O로 막히지 않습니다.
+    여러 번 호출해도 한 번만 설정됩니다.
+
+    Args:
+        level: 로그 레벨 (기본값: LOG_LEVEL 환경변수 또는 INFO)
+        slow_log_path: 느린 요청 로그를 따로 저장할 파일 (기본값: SLOW_REQUEST_LOG 환경변수)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    handlers = [stream_handler]
+
+    slow_log_path = slow_log_path or os.getenv("SLOW_REQUEST_LOG")
+    if slow_log_path:
+        file_handler = logging.FileHandler(slow_log_path, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        file_handler.addFilter(logging.Filter(slow_logger.name))
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(_TraceIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level or os.getenv("LOG_LEVEL", "INFO"))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class Trace:
+    """요청 하나의 span 기록"""
+
+    __slots__ = ("trace_id", "name", "attrs", "start", "spans", "duration_ms")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.duration_ms = None
+
+    def span_durations(self) -> Dict[str, float]:
+        """span 이름별 소요 시간 합계 (ms)"""
+        durations = {}
+        for span in self.spans:
+            if span["duration_ms"] is not None:
+                durations[span["name"]] = durations.get(span["name"], 0) + span["duration_ms"]
+        return durations
+
+    def waterfall(self) -> List[Dict]:
+        return sorted(self.spans, key=lambda span: span["start_ms"])
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """
+    요청 단위 trace 시작 (이 블록 안의 span이 모두 기록됨)
+
+    끝나면 요청 요약을 로그로 남기고, SLOW_REQUEST_MS를 넘으면
+    전체 span 워터폴을 slow_request 로그로 남깁니다.
+    """
+    current = Trace(name, attrs)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        current.duration_ms = round((time.perf_counter() - current.start) * 1000, 2)
+        _current_trace.reset(token)
+        _log_trace(current)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    현재 trace에 span 기록
+
+    크기·토큰 수 등은 블록 안에서 annotate()로 추가할 수 있습니다.
+    trace 밖에서는 아무 비용 없이 통과합니다.
+    """
+    current = _current_trace.get()
+    if current is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    record = {
+        "name": name,
+        "start_ms": round((start - current.start) * 1000, 2),
+        "duration_ms": None,
+        "attrs": attrs,
+    }
+    # 스레드 풀에서 실행되는 span도 같은 리스트에 추가됨 (list.append는 스레드 안전)
+    current.spans.append(record)
+    token = _current_span.set(record)
+    try:
+        yield
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        _current_span.reset(token)
+
+
+def annotate(**attrs):
+    """현재 열려 있는 span에 속성 추가 (span 밖이면 무시)"""
+    record = _current_span.get()
+    if record is not None:
+        record["attrs"].update(attrs)
+
+
+def _log_trace(current: Trace):
+    logger = logging.getLogger("trace")
+    fields = {
+        "trace_id": current.trace_id,
+        "trace": current.name,
+        "duration_ms": current.duration_ms,
+        **current.attrs,
+        "spans": current.span_durations(),
+    }
+    logger.info("request", extra={"fields": fields, "trace_id": current.trace_id})
+
+    if current.duration_ms >= SLOW_REQUEST_MS:
+        slow_logger.warning(
+            "slow request",
+            extra={
+                "fields": {**fields, "threshold_ms": SLOW_REQUEST_MS, "waterfall": current.waterfall()},
+                "trace_id": current.trace_id,
+            },
+        )
+
+
+class TraceMiddleware:
+    """
+    지정한 경로의 HTTP 요청마다 trace를 시작하는 ASGI 미들웨어
+
+    응답 헤더에 X-Trace-Id를 붙이고, 스트리밍 응답은 전송이 끝날 때까지를 요청 시간으로 봅니다.
+    """
+
+    def __init__(self, app, path_prefixes=("/chat", "/admin")):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        with trace(scope["path"], method=scope["method"]) as current:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    current.attrs["status"] = message["status"]
+                    message = {
+                        **message,
+                        "headers": list(message.get("headers", []))
+                        + [(b"x-trace-id", current.trace_id.encode("ascii"))],
+                    }
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,246 @@
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from typing import Dict, List
+
+from tracing import annotate
+
+
+class FixtureMissingError(LookupError):
+    """재생(replay) 모드에서 요청에 해당하는 녹화 기록이 없을 때"""
+
+
+class LiveTransport:
+    """
+    OpenAI / Pinecone 호출을 실제 네트워크로 보내는 기본 전송 계층
+
+    RAGSystem은 SDK 객체 대신 이 인터페이스(embed, chat, query, fetch, upsert, delete)만
+    사용하므로, 녹화/재생 전송 계층으로 그대로 교체할 수 있습니다.
+    모든 반환값은 SDK 객체가 아닌 순수 파이썬 자료형입니다.
+
+    Args:
+        on_headers: OpenAI 응답 헤더를 받을 콜백 on_headers(model, headers)
+                    (레이트 리밋 헤더로 스케줄러를 보정하는 데 사용)
+    """
+
+    def __init__(self, openai_client, index, on_headers=None):
+        self.openai_client = openai_client
+        self.index = index
+        self.on_headers = on_headers
+
+    def _parse(self, model: str, raw):
+        if self.on_headers is not None:
+            self.on_headers(model, raw.headers)
+        response = raw.parse()
+        # API가 집계한 실제 사용량을 현재 span에 기록 (embed/generate span)
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            annotate(**{
+                f"usage_{name}": getattr(usage, name)
+                for name in ('prompt_tokens', 'completion_tokens', 'total_tokens')
+                if getattr(usage, name, None) is not None
+            })
+        return response
+
+    def embed(self, model: str, inputs: List[str]) -> List[List[float]]:
+        raw = self.openai_client.embeddings.with_raw_response.create(model=model, input=inputs)
+        response = self._parse(model, raw)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def chat(self, **params) -> str:
+        raw = self.openai_client.chat.completions.with_raw_response.create(**params)
+        response = self._parse(params['model'], raw)
+        return response.choices[0].message.content
+
+    def query(self, vector: List[float], top_k: int) -> List[Dict]:
+        results = self.index.query(vector=vector, top_k=top_k, include_metadata=False)
+        return [{'id': match['id'], 'score': match['score']} for match in results['matches']]
+
+    def fetch(self, ids: List[str], namespace: str = "") -> Dict[str, Dict]:
+        fetched = self.index.fetch(ids=ids, namespace=namespace)
+        return {
+            doc_id: dict(vector['metadata'] or {})
+            for doc_id, vector in fetched['vectors'].items()
+        }
+
+    def upsert(self, vectors: List[tuple], namespace: str = ""):
+        self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def delete(self, ids: List[str]):
+        self.index.delete(ids=ids)
+
+    def record_chunks(self, chunks: Dict[str, Dict]):
+        """검색에 사용된 청크 기록 (녹화 모드에서만 의미 있음)"""
+
+
+def _pack_vector(vector: List[float]) -> bytes:
+    return struct.pack(f"<{len(vector)}f", *vector)
+
+
+def _encode_vector(vector: List[float]) -> str:
+    # float32 + base64로 저장하여 JSON 실수 배열보다 훨씬 작게 유지
+    return base64.b64encode(_pack_vector(vector)).decode('ascii')
+
+
+def _decode_vector(data: str) -> List[float]:
+    raw = base64.b64decode(data)
+    return list(struct.unpack(f"<{len(raw) // 4}f", raw))
+
+
+def _ids_params(ids: List[str], namespace: str) -> Dict:
+    # 기본 네임스페이스 요청은 기존 픽스처의 키가 그대로 유지되도록 namespace를 넣지 않음
+    return {'ids': ids, 'namespace': namespace} if namespace else {'ids': ids}
+
+
+def _request_key(kind: str, params: Dict) -> str:
+    """요청 내용으로 녹화 기록을 찾는 키 생성"""
+    params = dict(params)
+    if 'vector' in params:
+        # 재생 시 벡터는 float32로 복원되므로 float32 바이트 기준으로 해시
+        params['vector'] = hashlib.sha1(_pack_vector(params['vector'])).hexdigest()
+    payload = json.dumps({'kind': kind, **params}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class RecordingTransport:
+    """
+    실제 호출 결과를 JSONL 픽스처 파일에 기록하는 전송 계층
+
+    한 줄에 한 건씩 {"kind", "key", "latency_ms", "response"} 형식으로 저장하며,
+    임베딩 벡터는 float32 base64 문자열로 압축합니다.
+    """
+
+    def __init__(self, live: LiveTransport, fixture_path: str):
+        self.live = live
+        self.fixture_path = fixture_path
+        self._lock = threading.Lock()
+        self._recorded_chunks = set()
+        directory = os.path.dirname(fixture_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            with open(self.fixture_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+    def _call(self, kind: str, params: Dict, func, encode=lambda response: response):
+        start = time.perf_counter()
+        response = func()
+        latency_ms = (time.perf_counter() - start) * 1000
+        self._write({
+            'kind': kind,
+            'key': _request_key(kind, params),
+            'latency_ms': round(latency_ms, 1),
+            'response': encode(response),
+        })
+        return response
+
+    def embed(self, model: str, inputs: List[str]) -> List[List[float]]:
+        return self._call(
+            'embed', {'model': model, 'inputs': inputs},
+            lambda: self.live.embed(model, inputs),
+            lambda vectors: [_encode_vector(v) for v in vectors]
+        )
+
+    def chat(self, **params) -> str:
+        return self._call('chat', params, lambda: self.live.chat(**params))
+
+    def query(self, vector: List[float], top_k: int) -> List[Dict]:
+        return self._call(
+            'query', {'vector': vector, 'top_k': top_k},
+            lambda: self.live.query(vector, top_k)
+        )
+
+    def fetch(self, ids: List[str], namespace: str = "") -> Dict[str, Dict]:
+        return self._call('fetch', _ids_params(ids, namespace), lambda: self.live.fetch(ids, namespace))
+
+    def upsert(self, vectors: List[tuple], namespace: str = ""):
+        ids = [vector[0] for vector in vectors]
+        self._call(
+            'upsert', _ids_params(ids, namespace),
+            lambda: self.live.upsert(vectors, namespace),
+            lambda _: {'upserted_count': len(ids)}
+        )
+
+    def delete(self, ids: List[str]):
+        self._call('delete', {'ids': ids}, lambda: self.live.delete(ids), lambda _: None)
+
+    def record_chunks(self, chunks: Dict[str, Dict]):
+        # 재생 환경에 로컬 청크 저장소가 없어도 되도록 사용된 청크를 함께 기록
+        for doc_id, chunk in chunks.items():
+            if doc_id in self._recorded_chunks:
+                continue
+            self._recorded_chunks.add(doc_id)
+            self._write({'kind': 'chunk', 'key': doc_id, 'response': chunk})
+
+
+class ReplayTransport:
+    """
+    픽스처 파일의 기록을 네트워크 없이 그대로 돌려주는 전송 계층
+
+    같은 요청이 여러 번 기록되어 있으면 기록된 순서대로 번갈아 반환합니다.
+
+    Args:
+        fixture_path: RecordingTransport가 만든 JSONL 파일
+        replay_latency: True이면 기록된 지연시간만큼 대기 후 반환
+    """
+
+    def __init__(self, fixture_path: str, replay_latency: bool = False):
+        self.fixture_path = fixture_path
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._records: Dict[str, List[Dict]] = {}
+        self._cursors: Dict[str, int] = {}
+        self.chunks: Dict[str, Dict] = {}
+
+        with open(fixture_path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['kind'] == 'chunk':
+                    self.chunks[record['key']] = record['response']
+                else:
+                    self._records.setdefault(record['key'], []).append(record)
+
+    def _replay(self, kind: str, params: Dict):
+        key = _request_key(kind, params)
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                raise FixtureMissingError(f"녹화된 '{kind}' 요청이 없습니다 (key={key[:12]})")
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+        record = records[cursor % len(records)]
+
+        if self.replay_latency:
+            time.sleep(record.get('latency_ms', 0) / 1000)
+        return record['response']
+
+    def embed(self, model: str, inputs: List[str]) -> List[List[float]]:
+        encoded = self._replay('embed', {'model': model, 'inputs': inputs})
+        return [_decode_vector(v) for v in encoded]
+
+    def chat(self, **params) -> str:
+        return self._replay('chat', params)
+
+    def query(self, vector: List[float], top_k: int) -> List[Dict]:
+        return self._replay('query', {'vector': vector, 'top_k': top_k})
+
+    def fetch(self, ids: List[str], namespace: str = "") -> Dict[str, Dict]:
+        return self._replay('fetch', _ids_params(ids, namespace))
+
+    def upsert(self, vectors: List[tuple], namespace: str = ""):
+        self._replay('upsert', _ids_params([vector[0] for vector in vectors], namespace))
+
+    def delete(self, ids: List[str]):
+        self._replay('delete', {'ids': ids})
+
+    def record_chunks(self, chunks: Dict[str, Dict]):
+        pass
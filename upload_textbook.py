@@ -1,17 +1,28 @@
 import os
+import json
+import logging
 from PyPDF2 import PdfReader
 from rag_system import RAGSystem
+from chunk_store import SHARED_SOURCE, make_ref
+from dedup import dedupe_chunks
+from outbound_scheduler import BACKGROUND
+from tracing import setup_logging
 from dotenv import load_dotenv
 import re
+import time
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class TextbookUploader:
     def __init__(self):
         self.rag = RAGSystem(
             openai_api_key=os.getenv("OPENAI_API_KEY"),
             pinecone_api_key=os.getenv("PINECONE_API_KEY"),
-            pinecone_env=os.getenv("PINECONE_ENV")
+            pinecone_env=os.getenv("PINECONE_ENV"),
+            chunk_store_path=os.getenv("CHUNK_STORE_PATH", "chunk_store.db"),
+            rate_limits=json.loads(os.getenv("OPENAI_RATE_LIMITS") or "{}")
         )
         
     def extract_text_from_pdf(self, pdf_path: str) -> str:
@@ -79,60 +90,195 @@ class TextbookUploader:
         
         return "Unknown Chapter"
     
-    def upload_textbook(self, pdf_path: str, textbook_name: str):
+    def prepare_chunks(self, pdf_path: str, textbook_name: str, revision: int, progress=None) -> list:
         """
-        교재를 벡터 DB에 업로드
+        PDF에서 텍스트를 추출해 청크로 분할
         
-        Args:
-            pdf_path: PDF 파일 경로
-            textbook_name: 교재 이름 (예: "검색광고마케터1급", "SNS광고마케터1급")
+        Returns:
+            (청크 텍스트, 메타데이터) 튜플 리스트
         """
-        print(f"📚 '{textbook_name}' 교재 업로드 시작...")
+        if progress is None:
+            progress = lambda stage, done, total: None
         
         # 1. PDF에서 텍스트 추출
-        print("📄 PDF 텍스트 추출 중...")
+        progress("extracting", 0, 0)
         full_text = self.extract_text_from_pdf(pdf_path)
         
         # 2. 텍스트를 청크로 분할
-        print("✂️  텍스트 청크 분할 중...")
+        progress("chunking", 0, 0)
         chunks = self.chunk_text(full_text, chunk_size=1000, overlap=200)
-        print(f"   총 {len(chunks)}개의 청크 생성됨")
+        logger.info(
+            "텍스트 청크 분할 완료",
+            extra={"fields": {"textbook": textbook_name, "revision": revision, "chunks": len(chunks)}}
+        )
         
-        # 3. 각 청크를 벡터 DB에 업로드
-        print("☁️  벡터 DB에 업로드 중...")
-        for i, chunk in enumerate(chunks):
-            chapter = self.detect_chapter(chunk)
-            
-            metadata = {
+        return [
+            (chunk, {
                 'source': textbook_name,
                 'chunk_id': i,
-                'chapter': chapter,
-                'total_chunks': len(chunks)
-            }
+                'chapter': self.detect_chapter(chunk),
+                'total_chunks': len(chunks),
+                'revision': revision
+            })
+            for i, chunk in enumerate(chunks)
+        ]
+    
+    def remove_duplicates(self, items: list) -> tuple:
+        """거의 같은 청크를 하나로 합쳐 임베딩할 청크 목록과 중복 제거 리포트 반환"""
+        items, report = dedupe_chunks(items)
+        logger.info(
+            "중복 청크 제거",
+            extra={"fields": {
+                key: report[key]
+                for key in ('chunks', 'unique', 'dropped', 'dedup_ratio', 'duplicate_groups', 'chars_saved')
+            }}
+        )
+        return items, report
+    
+    def embed_chunks(self, items: list, progress=None, batch_size: int = 50):
+        """청크를 묶음 단위로 임베딩하여 벡터 DB와 로컬 저장소에 저장"""
+        if progress is None:
+            progress = lambda stage, done, total: None
+        
+        progress("embedding", 0, len(items))
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
             
-            self.rag.add_document(chunk, metadata)
+            # 업로드 임베딩은 대화형 요청의 한도 몫을 남겨두도록 낮은 우선순위로 요청
+            self.rag.add_documents(
+                [text for text, _ in batch],
+                [metadata for _, metadata in batch],
+                priority=BACKGROUND
+            )
             
             # 진행상황 표시
-            if (i + 1) % 10 == 0:
-                print(f"   진행: {i + 1}/{len(chunks)} 청크 완료")
+            done = start + len(batch)
+            progress("embedding", done, len(items))
+            logger.info("임베딩 진행", extra={"fields": {"done": done, "total": len(items)}})
+    
+    def upload_textbook(self, pdf_path: str, textbook_name: str, revision: int = None,
+                        activate: bool = True, progress=None, batch_size: int = 50,
+                        dedup: bool = True):
+        """
+        교재를 벡터 DB에 업로드
+        
+        청크는 새 리비전으로 저장되며, 모두 올라간 뒤에 활성화되므로
+        업로드 도중에도 검색에는 이전 내용이 그대로 사용됩니다.
+        
+        Args:
+            pdf_path: PDF 파일 경로
+            textbook_name: 교재 이름 (예: "검색광고마케터1급", "SNS광고마케터1급")
+            revision: 저장할 리비전 번호 (기본값: 현재 시각)
+            activate: 업로드 후 바로 새 리비전을 활성화할지 여부
+                      (작업 프로세스에서는 False로 두고 서버가 활성화)
+            progress: 진행 상황 콜백 progress(stage, done, total)
+            batch_size: 임베딩/업로드를 한 번에 처리할 청크 수
+            dedup: 임베딩 전에 교재 안의 거의 같은 청크를 하나로 합칠지 여부
+        
+        Returns:
+            {'revision', 'chunks': 임베딩한 청크 수, 'dedup': 중복 제거 리포트 (dedup=False면 None)}
+        """
+        if revision is None:
+            revision = int(time.time())
+        if progress is None:
+            progress = lambda stage, done, total: None
+        
+        log_fields = {"textbook": textbook_name, "revision": revision}
+        logger.info("교재 업로드 시작", extra={"fields": log_fields})
+        
+        # 1. 추출 + 청크 분할
+        items = self.prepare_chunks(pdf_path, textbook_name, revision, progress)
+        
+        # 2. 중복 청크 제거 (임베딩 호출과 인덱스 크기 절감)
+        report = None
+        if dedup:
+            progress("deduplicating", 0, len(items))
+            items, report = self.remove_duplicates(items)
+        
+        # 3. 청크를 묶음 단위로 임베딩하여 벡터 DB에 업로드
+        self.embed_chunks(items, progress, batch_size)
+        
+        # 4. 새 리비전 활성화
+        if activate:
+            progress("activating", len(items), len(items))
+            self.rag.activate_revision(textbook_name, revision)
+        
+        logger.info("교재 업로드 완료", extra={"fields": {**log_fields, "chunks": len(items)}})
+        return {'revision': revision, 'chunks': len(items), 'dedup': report}
+    
+    def share_cross_book_chunks(self, items: list, revision: int) -> list:
+        """
+        여러 교재에 걸친 대표 청크를 공유 청크(SHARED_SOURCE)로 옮김
         
-        print(f"✅ '{textbook_name}' 업로드 완료!\n")
+        대표 청크를 먼저 나온 교재에 두면, 그 교재만 다시 업로드할 때 이전 리비전과 함께
+        삭제되어 다른 교재에서도 사라집니다. 공유 청크는 refs에 적힌 교재 리비전 중
+        하나라도 활성인 동안 사용되고, 모두 교체된 뒤에야 삭제됩니다.
+        """
+        result = []
+        shared = 0
+        for text, metadata in items:
+            sources = metadata.get('sources') or []
+            if len(sources) > 1:
+                metadata = {
+                    **metadata,
+                    'source': SHARED_SOURCE,
+                    'chunk_id': shared,
+                    'revision': revision,
+                    'refs': [make_ref(source, revision) for source in sources],
+                }
+                shared += 1
+            result.append((text, metadata))
+        return result
     
-    def upload_multiple_textbooks(self, textbook_files: dict):
+    def upload_multiple_textbooks(self, textbook_files: dict, dedup: bool = True,
+                                  report_path: str = "dedup_report.json"):
         """
         여러 교재를 한번에 업로드
         
+        모든 교재를 먼저 청크로 나눈 뒤 함께 중복 제거하므로, 교재끼리 겹치는 내용
+        (플랫폼 소개, 반복되는 용어 정의 등)도 한 번만 임베딩됩니다.
+        여러 교재에 걸친 대표 청크는 공유 청크로 저장되어 한 교재를 교체해도 다른 교재에 남습니다.
+        
         Args:
             textbook_files: {교재명: PDF경로} 딕셔너리
+            dedup: 중복 청크를 합칠지 여부
+            report_path: 중복 제거 리포트(JSON)를 저장할 경로
+        
+        Returns:
+            중복 제거 리포트 (dedup=False면 None)
         """
+        revision = int(time.time())
+        items = []
+        uploaded = []
         for name, path in textbook_files.items():
             if os.path.exists(path):
-                self.upload_textbook(path, name)
+                logger.info("교재 업로드 시작", extra={"fields": {"textbook": name, "revision": revision}})
+                items.extend(self.prepare_chunks(path, name, revision))
+                uploaded.append(name)
             else:
-                print(f"⚠️  파일을 찾을 수 없습니다: {path}")
+                logger.warning("파일을 찾을 수 없습니다", extra={"fields": {"path": path}})
+        
+        report = None
+        if dedup:
+            items, report = self.remove_duplicates(items)
+            items = self.share_cross_book_chunks(items, revision)
+            report['shared_chunks'] = sum(1 for _, metadata in items if metadata['source'] == SHARED_SOURCE)
+            if report_path:
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+        
+        self.embed_chunks(items)
+        
+        # 공유 청크는 refs의 교재 리비전이 활성화되어야 검색되므로 모든 교재를 올린 뒤 활성화
+        for name in uploaded:
+            self.rag.activate_revision(name, revision)
+        
+        logger.info("교재 업로드 완료", extra={"fields": {"textbooks": uploaded, "chunks": len(items)}})
+        return report
 
 
 if __name__ == "__main__":
+    setup_logging()
     uploader = TextbookUploader()
     
     # 교재 파일 경로 설정
@@ -141,7 +287,10 @@ if __name__ == "__main__":
         "SNS광고마케터1급": "./textbooks/SNS광고마케터1급.pdf"
     }
     
-    # 업로드 실행
-    uploader.upload_multiple_textbooks(textbooks)
+    # 업로드 실행 (교재 간 중복 청크는 한 번만 임베딩)
+    report = uploader.upload_multiple_textbooks(textbooks)
+    if report:
+        print(f"🧹 중복 청크 제거: {report['chunks']}개 → {report['unique']}개 "
+              f"({report['dedup_ratio']:.1%} 감소, 리포트: dedup_report.json)")
     
     print("🎉 모든 교재 업로드가 완료되었습니다!")
\ No newline at end of file